@@ -12,7 +12,14 @@ class NodeType(str, Enum):
     PostfixUnaryExpression = "PostfixUnaryExpression"
     PrefixUnaryExpression = "PrefixUnaryExpression"
     BinaryOperationExpression = "BinaryOperationExpression"
+    IntBinaryOperationExpression = "IntBinaryOperationExpression"
+    FloatBinaryOperationExpression = "FloatBinaryOperationExpression"
+    MixedBinaryOperationExpression = "MixedBinaryOperationExpression"
+    TypedBinaryOperationExpression = "TypedBinaryOperationExpression"
     Identifier = "Identifier"
+    LocalIdentifier = "LocalIdentifier"
+    RegisterIdentifier = "RegisterIdentifier"
+    GlobalIdentifier = "GlobalIdentifier"
     IntLiteral = "IntLiteral"
     FloatLiteral = "FloatLiteral"
     CharacterLiteral = "CharacterLiteral"
@@ -24,6 +31,7 @@ class NodeType(str, Enum):
     Subscript = "Subscript"
     MemberSelection = "MemberSelection"
     ChainExpression = "ChainExpression"
+    Cast = "Cast"
     
     Function = "Function"
     Struct = "Struct"
@@ -34,6 +42,8 @@ class NodeType(str, Enum):
     IfStatement = "IfStatement"
     ForStatement = "ForStatement"
     WhileStatement = "WhileStatement"
+    BreakStatement = "BreakStatement"
+    ContinueStatement = "ContinueStatement"
     Assignment = "Assignment"
     Declaration = "Declaration"
     ExpressionStatement = "ExpressionStatement"
@@ -51,6 +61,9 @@ class Node:
         self.type = type
         self.value = value
         
+        # Resolved C type, assigned by the TypeChecker
+        self.ctype = None
+        
         self.children = {} 
         
     def format_file_pos(self):
@@ -135,6 +148,9 @@ class UnaryExpression(Expression):
         super().__init__(node_type, operator)
         self.add("Operand", operand)
         
+        # Amount '++'/'--' add, the pointee size for pointers
+        self.step = 1
+        
 class Prefix(UnaryExpression):
     def __init__(self, operand, operator):
         super().__init__(NodeType.PrefixUnaryExpression, operator, operand)
@@ -148,10 +164,23 @@ class Binary(Expression):
         super().__init__(NodeType.BinaryOperationExpression, operator)
         self.add("LeftOperand", lhs)
         self.add("RightOperand", rhs)
+        
+        # Quickening state, see Interpreter.quickenBinary
+        self.operation = None
+        self.deopt_count = 0
 
 class Identifier(Expression):
     def __init__(self, symbol_name):
         super().__init__(NodeType.Identifier, symbol_name)
+        
+        # Storage resolved by the frame layout, see Interpreter.layoutFunction
+        self.offset = None
+        self.address = None
+        self.slot = None
+        self.format = None
+        
+        # Declarator the name refers to, assigned by the TypeChecker
+        self.declaration = None
     
 class PrimitiveLiteral(Expression):
     def __init__(self, node_type, primitive_type, primitive_value):
@@ -190,6 +219,8 @@ class StringLiteral(ObjectLiteral):
 class ArrayLiteral(ObjectLiteral):
     def __init__(self, type, elements):
         super().__init__(NodeType.ArrayLiteral, None, type, elements)
+        for i in range(len(elements)):
+            self.add(f"Element{i+1}", elements[i])
         
 class ChainExpression(Expression):
     def __init__(self, head, chain):
@@ -204,6 +235,15 @@ class FunctionInvocation(Expression):
         for i in range(len(arguments)):
             self.add(f"Arg{i+1}", arguments[i])
             
+        # Caller owned storage for a returned struct, an offset in the
+        #   enclosing frame or an address for calls at the top-level
+        self.result_offset = None
+        self.result_address = None
+        
+        # Call site cache, see Interpreter.resolveCallee
+        self.function = None
+        self.arguments = None
+            
 class Subscript(Expression):
     def __init__(self, locator, index):
         super().__init__(NodeType.Subscript)
@@ -219,9 +259,18 @@ class MemberSelection(Expression):
         self.add("Member", member)
         
 
+class Cast(Expression):
+    def __init__(self, operand, target_type):
+        super().__init__(NodeType.Cast, str(target_type))
+        self.add("Operand", operand)
+        self.ctype = target_type
+        self.start = operand.start
+        self.end = operand.end
+        
+
 class Statement(Node):
-    def __init__(self, node_type, type = None, value = None, side_effects = None):
-        super().__init__(node_type, type, value)
+    def __init__(self, node_type, name = None, type = None, value = None, side_effects = None):
+        super().__init__(node_type, name, type, value)
         self.side_effects = side_effects
         
 class ExpressionStatement(Statement):
@@ -230,17 +279,35 @@ class ExpressionStatement(Statement):
         self.add("Expression", expr)
 
 class Conditional(Statement):
-    def __init__(self, if_true, then, otherwise, is_loop):
+    def __init__(self, if_true, then, otherwise, is_loop, init = None, step = None):
         super().__init__(NodeType.ConditionalStatement)
+        self.add("Init", init)
         self.add("If", if_true)
         self.add("Then", then)
         self.add("Else", otherwise)
+        self.add("Step", step)
             
         self.is_loop = is_loop
         
+        # Loop execution state, see Interpreter.prepareLoop
+        self.body = None
+        self.condition = None
+        self.advance = None
+        self.vector = None
+        self.frame_size = None
+        self.register_count = 0
+        
+class Break(Statement):
+    def __init__(self):
+        super().__init__(NodeType.BreakStatement)
+        
+class Continue(Statement):
+    def __init__(self):
+        super().__init__(NodeType.ContinueStatement)
+        
 class Declaration(Statement):
     def __init__(self, type, declarations):
-        super().__init__(NodeType.Declaration, type)
+        super().__init__(NodeType.Declaration, None, type)
         for i in range(len(declarations)):
             self.add(f"Decl{i+1}", declarations[i])
         
@@ -251,6 +318,9 @@ class Assignment(Statement):
         super().__init__(NodeType.Assignment, assignment_operator)
         self.add("LValue", symbol)
         self.add("RValue", value)
+        
+        # Type the result of a compound assignment is converted back to
+        self.conversion = None
 
 class Function(Statement):
 
@@ -258,17 +328,34 @@ class Function(Statement):
         super().__init__(NodeType.Function, function_name, return_type, arguments)
         self.return_type = return_type
         self.arguments = arguments
-        self.add(body)
+        self.add("Body", body)
+        
+        # Frame layout, see Interpreter.layoutFunction
+        self.frame_size = 0
+        self.register_count = 0
+        self.parameter_slots = []
+        self.statements = []
+        
+        # Set by Optimizer.markPureFunctions, the result cache of a pure
+        #   function when calls are memoized
+        self.pure = False
+        self.memo = None
 
 class Struct(Statement):
     def __init__(self, struct_name, attributes):
-        super().__init__(NodeType.Struct)
+        super().__init__(NodeType.Struct, struct_name)
         self.attributes = attributes
+        for i in range(len(attributes)):
+            self.add(f"Attribute{i+1}", attributes[i])
         
 class Return(Statement):
     def __init__(self, return_value):
         super().__init__(NodeType.ReturnStatement)
         self.add("Ret", return_value)
+        
+        # Returns a call's result unchanged from a frame nothing points into,
+        #   the call then reuses the frame instead of nesting a new one
+        self.tail_call = False
     
        
 def toString(tree, depth):
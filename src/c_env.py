@@ -1,5 +1,3 @@
-
-
 class Environment:
     def __init__(self, parent_env, env_name = ""):
         self.variable_mapping = {}
@@ -9,20 +7,32 @@ class Environment:
         self.depth = 0 if not self.parent_env else self.parent_env.depth + 1
         self.name = env_name if env_name else f"Environment{self.depth}"
         
-        if self.parent_env:
-            for (key, value) in self.parent_env.variable_mapping.items():
-                self.insert_mapping(key[0], key[1], value)
-        
         
     def insert_mapping(self, var_name, var_type, var_value):
         return self.variable_mapping.setdefault(var_name, (var_value, var_type, self.depth)) is not None
         
     def get_mapping(self, var_name):
-        return self.variable_mapping.get(var_name, (None, None, None))
+        env = self
+        while env:
+            mapping = env.variable_mapping.get(var_name)
+            if mapping is not None:
+                return mapping
+            env = env.parent_env
+        return (None, None, None)
+    
+    def update_mapping(self, var_name, var_value):
+        env = self
+        while env:
+            mapping = env.variable_mapping.get(var_name)
+            if mapping is not None:
+                (_, var_type, depth) = mapping
+                env.variable_mapping[var_name] = (var_value, var_type, depth)
+                return True
+            env = env.parent_env
+        return False
         
     def propagate_mapping(self, var_name, var_type, var_value):
         pass
         
     def __str__(self):
         return f"{str(self.parent_env) + "\n" if self.parent_env else ""}{'\t' * self.depth}{self.name} @ depth {self.depth}: {self.variable_mapping}"
-    
\ No newline at end of file
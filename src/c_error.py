@@ -9,6 +9,8 @@ class Error(Exception):
         super().__init__(err_msg)
 
     def __str__(self):
+        if self.lexer is None:
+            return self.err_msg
         return f"{self.err_msg} {self.lexer}"
 
 
@@ -27,10 +29,19 @@ class ValueError(Error):
         super().__init__(lexer, f"Value error: {err_msg}")
 
 
+class TypeError(Error):
+    def __init__(self, lexer, err_msg):
+        super().__init__(lexer, f"Type error: {err_msg}")
+
+
 class RuntimeError(Error):
     def __init__(self, lexer, err_msg):
         super().__init__(lexer, f"Runtime error: {err_msg}")
         
+class StackOverflowError(RuntimeError):
+    def __init__(self, lexer, err_msg):
+        super().__init__(lexer, f"Stack overflow: {err_msg}")
+        
 class DebugError(Error):
     def __init__(self, lexer, err_msg):
         super().__init__(lexer, f"Debug error: {err_msg}")
\ No newline at end of file
@@ -1,16 +1,43 @@
 from c_lexer import *
 from c_parse import *
 from c_ast import *
+from c_types import *
 from c_env import *
 from c_error import *
+from c_typecheck import *
+from c_optimize import *
+from c_vectorize import *
+from c_memory import *
+
+import functools
+import sys
 
 ONE_K = 1024
 EIGHT_K = 8 * ONE_K
+
+# Size of the call stack arena, 8 MiB like a typical native stack
+DEFAULT_STACK_SIZE = EIGHT_K * ONE_K
+
+# Host recursion needed per C call, every call nests this many evaluator
+#   frames at most for bodies of ordinary depth
+PYTHON_FRAMES_PER_CALL = 32
+
+# Call depth the host recursion limit is raised for at most, deeper
+#   recursion than this is reported as a stack overflow even if the arena
+#   has room left, bounds the memory the host interpreter may use
+MAX_CALL_DEPTH = 50 * ONE_K
+
+# Number of times a quickened node may fall back to the generic path before it
+# stops specializing, avoids thrashing on operands whose types keep changing
+QUICKEN_DEOPT_LIMIT = 8
+
+# Results kept per memoized function, the least recently used go first
+MEMO_CACHE_SIZE = 64 * ONE_K
     
 
 class Interpreter:
     
-    def __init__(self, filename, debug = False):
+    def __init__(self, filename, debug = False, typecheck = True, stack_size = DEFAULT_STACK_SIZE, optimize = DEFAULT_OPTIMIZE_LEVEL, memoize = False):
         self.lex = Lexer(filename)
         self.parser = Parser(self.lex, debug)
         self.trace_depth = 0
@@ -18,30 +45,104 @@ class Interpreter:
         
         self.ast = self.parser.parseFile()
         
+        # Keeping locals out of memory needs the TypeChecker's declarations
+        self.typechecked = typecheck
+        if typecheck:
+            TypeChecker(self.lex, debug).checkModule(self.ast)
+        
+        # Counts of the rewrites made before execution, see Optimizer
+        optimizer = Optimizer(self.lex, debug)
+        optimizer.optimizeModule(self.ast, optimize)
+        self.optimizations = optimizer.report
+        
+        # Calls to pure functions go through a result cache when asked for,
+        #   purity is only known with types
+        self.memoize = memoize and typecheck
+        if self.memoize:
+            optimizer.markPureFunctions(self.ast)
+        
+        # Array loops run as NumPy operations where it is installed, see VectorLoop
+        self.vectorize = typecheck and optimize >= OPTIMIZE_BASIC and vectorizationAvailable()
+        
         # Data & Code memory
+        self.memory = Memory(NULL_GUARD + stack_size + EIGHT_K)
+        self.stack = Stack(self.memory, stack_size)
+        call_depth = min(self.stack.size // FRAME_ALIGN, MAX_CALL_DEPTH)
+        self.recursion_limit = call_depth * PYTHON_FRAMES_PER_CALL
+        self.string_table = {}
         self.current_env = Environment(None, "Global")
         
+        # Active call frame, None while executing top-level statements, and
+        #   the values of its locals kept in registers
+        self.frame_base = None
+        self.registers = None
+        self.returning = False
+        self.return_value = None
+        self.tail_call = None
+        
+        # Control flow leaving a block early, `unwinding` is set for any of
+        #   return, break and continue so blocks check a single flag
+        self.unwinding = False
+        self.breaking = False
+        self.continuing = False
+        
         self.function_map = {}
         self.struct_map = {}
         
+        self.heap = Heap(self.memory)
+        self.builtin_map = {
+            "malloc": self.builtinMalloc,
+            "calloc": self.builtinCalloc,
+            "realloc": self.builtinRealloc,
+            "free": self.builtinFree,
+        }
+        
     def newEnvironment(self, name = ""):
         self.current_env = Environment(self.current_env, name)
         
-    def declareVariable(self, name, type, value):
+    # Variables live in memory, the environment maps their name to (address, type)
+    def declareVariable(self, name, type, value = None):
         (_, _, depth) = self.current_env.get_mapping(name)
         if depth == self.current_env.depth:
             raise RuntimeError(self.lex, "Illegal redeclaration in same scope")
-        self.current_env.insert_mapping(name, type, value)
+        address = self.memory.allocate(sizeOf(type), alignOf(type))
+        self.current_env.insert_mapping(name, type, address)
+        if value is not None:
+            self.memory.storeValue(address, type, value)
+        return address
+        
+    def lookupVariable(self, name):
+        (address, type, depth) = self.current_env.get_mapping(name)
+        if depth is None:
+            raise RuntimeError(self.lex, f"Use of undeclared variable '{name}'")
+        return (address, type)
         
     def updateVariable(self, name, new_value):
-        type = self.resolveType(new_value)
-        self.current_env.update_mapping()
+        (address, type) = self.lookupVariable(name)
+        self.memory.storeValue(address, type, new_value)
         
     def readVariable(self, name):
-        var_info = self.current_env.get_mapping(name)
-        if var_info is None:
-            raise RuntimeError(self.lex, "Reading from undeclared value")
-        return var_info
+        (address, type) = self.lookupVariable(name)
+        return self.memory.loadValue(address, type)
+    
+    # Type of an lvalue, identifiers of untyped trees are typed by their declaration
+    def lvalueType(self, node):
+        if node.ctype is None and node.node_type == NodeType.Identifier:
+            return self.lookupVariable(node.name)[1]
+        return node.ctype
+    
+    # Accesses through pointers, arrays and structs need the TypeChecker's types
+    def accessType(self, node):
+        if node.ctype is None:
+            raise RuntimeError(self.lex, f"{node.node_type.value} requires type checking")
+        return node.ctype
+    
+    def stringAddress(self, string):
+        address = self.string_table.get(string)
+        if address is None:
+            address = self.memory.allocateString(string)
+            self.string_table[string] = address
+        return address
         
     def getTruthyFalsey(self, value):
         match value:
@@ -67,29 +168,202 @@ class Interpreter:
         
        
     def evaluateFunctionCall(self, node):
+        function = node.function
+        if function is None:
+            function = self.resolveCallee(node)
+        if function.__class__ is not Function:
+            return function(*[self.evaluateExpression(argument) for argument in node.arguments])
+        if function.memo is not None:
+            return self.callMemoized(function, node)
+        
+        result_address = None
+        if node.ctype.__class__ is StructType:
+            result_address = self.resultAddress(node)
+        
+        # Arguments are evaluated in the caller's frame and stored straight
+        #   into the parameter slots of the callee's frame, pushed beforehand
+        frame_base = self.stack.push(function.frame_size)
+        registers = [0] * function.register_count
+        try:
+            memory = self.memory
+            for (argument, (location, format, type, convert)) in zip(node.arguments, function.parameter_slots):
+                value = self.evaluateExpression(argument)
+                if convert is not None:
+                    registers[location] = convert(value)
+                elif format is None:
+                    memory.storeValue(frame_base + location, type, value)
+                else:
+                    memory.store(frame_base + location, format, value)
+        except BaseException:
+            self.stack.pop(frame_base)
+            raise
+        
+        if self.frame_base is None:
+            return self.runWithHostRecursion(self.runFrame, function, frame_base, registers, result_address)
+        return self.runFrame(function, frame_base, registers, result_address)
+    
+    # Resolves the callee once and caches it on the call site, definitions
+    #   are registered before any call runs and can not change afterwards
+    def resolveCallee(self, node):
+        name = node.children["Callee"].name
+        function = self.function_map.get(name) or self.builtin_map.get(name)
+        if function is None:
+            raise RuntimeError(self.lex, f"Call to undefined function '{name}'")
+        node.arguments = [child for (key, child) in node.children.items() if key != "Callee"]
+        node.function = function
+        return function
+        
+    # A returned struct lives in the callee's frame, it is copied out to
+    #   storage of the caller before that frame is popped
+    def resultAddress(self, node):
+        if node.result_offset is not None and self.frame_base is not None:
+            return self.frame_base + node.result_offset
+        if node.result_address is None:
+            node.result_address = self.memory.allocate(sizeOf(node.ctype), alignOf(node.ctype))
+        return node.result_address
         
-        if node.node_type == NodeType.FunctionCall:
-            function_name = node.children["Locator"].name
-            args = [self.evaluateExpression(node.children[f"Arg{i+1}"]) for i in range(len(node.children))]
+    def executeFunction(self, function_name, args, result_address = None):
+        function = self.function_map.get(function_name)
+        if function is None:
+            if function_name in self.builtin_map:
+                return self.builtin_map[function_name](*args)
+            raise RuntimeError(self.lex, f"Call to undefined function '{function_name}'")
+        
+        return self.callFunction(function, args, result_address)
+    
+    def callFunction(self, function, args, result_address = None):
+        frame_base = self.stack.push(function.frame_size)
+        registers = self.bindArguments(function, frame_base, args)
+        if self.frame_base is None:
+            return self.runWithHostRecursion(self.runFrame, function, frame_base, registers, result_address)
+        return self.runFrame(function, frame_base, registers, result_address)
+    
+    # Memoization
+    #   a pure function's calls go through a bounded LRU cache keyed by its
+    #   arguments, converted to the parameter types first so arguments that
+    #   bind the same values share an entry. A call that raises is not cached,
+    #   and a tail call keeps its constant stack by bypassing the cache
+    
+    def memoizeFunction(self, function):
+        function.memo = functools.lru_cache(maxsize = MEMO_CACHE_SIZE)(lambda *args: self.callFunction(function, args))
+    
+    def callMemoized(self, function, node):
+        return function.memo(*[STORED_VALUE_CONVERTERS[format](self.evaluateExpression(argument))
+                               for (argument, (_, format, _, _)) in zip(node.arguments, function.parameter_slots)])
+    
+    # Stores the arguments of a call to `function` in its frame, returns the
+    #   frame's registers
+    def bindArguments(self, function, frame_base, values):
+        registers = [0] * function.register_count
+        for ((location, format, type, convert), value) in zip(function.parameter_slots, values):
+            if convert is not None:
+                registers[location] = convert(value)
+            else:
+                self.memory.storeValue(frame_base + location, type, value)
+        return registers
+    
+    # Frames entered from the top-level run with a host recursion limit deep
+    #   enough for the stack arena to be the limit that is reached
+    def runWithHostRecursion(self, run, *args):
+        if self.debug:
+            return run(*args)
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(recursion_limit, self.recursion_limit))
+        try:
+            return run(*args)
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+    
+    # Runs a function in its pushed frame. A tail call pops the frame and
+    #   pushes the called function's at the same address, so tail recursion
+    #   runs as a loop in constant stack
+    def runFrame(self, function, frame_base, registers, result_address):
+        caller_base = self.frame_base
+        caller_registers = self.registers
+        try:
+            while True:
+                self.frame_base = frame_base
+                self.registers = registers
+                self.evaluateStatements(function.statements)
+                if self.tail_call is None:
+                    break
+                (function, values) = self.tail_call
+                self.tail_call = None
+                self.returning = False
+                self.unwinding = False
+                self.stack.pop(frame_base)
+                frame_base = self.stack.push(function.frame_size)
+                registers = self.bindArguments(function, frame_base, values)
             
-            return self.executeFunction(function_name, args)
+            return_value = self.return_value
+            if result_address is not None and return_value is not None:
+                self.memory.copy(result_address, return_value, sizeOf(function.ctype.return_type))
+                return_value = result_address
+            return return_value
+        except RecursionError:
+            # The host interpreter ran out of frames before the arena did
+            raise StackOverflowError(self.lex, f"call depth exceeded in '{function.name}'") from None
+        finally:
+            self.frame_base = caller_base
+            self.registers = caller_registers
+            self.stack.pop(frame_base)
+            self.returning = False
+            self.unwinding = False
+            self.return_value = None
+            self.tail_call = None
+    
+    # Heap builtins
+    
+    def builtinMalloc(self, size):
+        return self.heap.allocate(size)
+    
+    def builtinCalloc(self, count, size):
+        address = self.heap.allocate(count * size)
+        if address:
+            self.memory.fill(address, count * size)
+        return address
+    
+    def builtinRealloc(self, address, size):
+        return self.heap.reallocate(address, size)
+    
+    def builtinFree(self, address):
+        self.heap.free(address)
     
     def evaluateSubscript(self, node):
         
         if node.node_type == NodeType.Subscript:
-            collection_name = node.children["Locator"].name
-            index = self.evaluateExpression(node.children["Index"])
-            
-            return self.indexLookup(collection_name, index)
+            return self.memory.loadValue(self.evaluateAddress(node), self.accessType(node))
     
     def evaluateMemberSelection(self, node):
         
         if node.node_type == NodeType.MemberSelection:
-            
-            locator = self.evaluateChainExpression(node.children["Locator"])
-            member = self.evaluateChainExpression(node.children["Member"])
-            
-            return self.memberLookup(locator, member)
+            return self.memory.loadValue(self.evaluateAddress(node), self.accessType(node))
+        
+    # Address of an lvalue. Array and struct values already evaluate to their
+    #   address, so indexing and member access work the same on variables,
+    #   pointers and returned aggregates
+    def evaluateAddress(self, node):
+        match node.node_type:
+            case NodeType.LocalIdentifier:
+                return self.frame_base + node.offset
+            case NodeType.GlobalIdentifier:
+                return node.address
+            case NodeType.Identifier:
+                return self.lookupVariable(node.name)[0]
+            case NodeType.Subscript:
+                base = self.evaluateExpression(node.children["Locator"])
+                index = self.evaluateExpression(node.children["Index"])
+                return base + index * sizeOf(self.accessType(node))
+            case NodeType.MemberSelection:
+                struct = node.children["Object"]
+                self.accessType(struct)
+                struct_type = struct.ctype.target if node.access_type == "->" else struct.ctype
+                return self.evaluateExpression(struct) + layoutStruct(struct_type).offsets[node.children["Member"].name]
+            case NodeType.PrefixUnaryExpression if node.name == "*":
+                return self.evaluateExpression(node.children["Operand"])
+            case NodeType.Parenthetical:
+                return self.evaluateAddress(node.children["Group"])
+        raise RuntimeError(self.lex, f"Expression is not addressable: {node.node_type}")
    
     @trace
     def evaluateExpression(self, node):
@@ -100,41 +374,456 @@ class Interpreter:
             value = node.value
 
             match node_type:
+                case NodeType.TypedBinaryOperationExpression:
+                    return node.operation(self.evaluateExpression(node.children["LeftOperand"]), self.evaluateExpression(node.children["RightOperand"]))
+                case NodeType.IntBinaryOperationExpression:
+                    return self.evaluateIntBinary(node)
+                case NodeType.FloatBinaryOperationExpression:
+                    return self.evaluateFloatBinary(node)
+                case NodeType.MixedBinaryOperationExpression:
+                    return self.evaluateMixedBinary(node)
+                case NodeType.RegisterIdentifier:
+                    return self.registers[node.slot]
+                case NodeType.LocalIdentifier:
+                    if node.format is None:
+                        return self.frame_base + node.offset
+                    return self.memory.load(self.frame_base + node.offset, node.format)
+                case NodeType.GlobalIdentifier:
+                    if node.format is None:
+                        return node.address
+                    return self.memory.load(node.address, node.format)
                 case NodeType.IntLiteral | NodeType.FloatLiteral:
                     return value
+                case NodeType.CharacterLiteral:
+                    return ord(value)
+                case NodeType.StringLiteral:
+                    return self.stringAddress(value)
+                case NodeType.BooleanLiteral:
+                    return 1 if value else 0
                 case NodeType.Identifier:
-                    return self.readVariable(name, type, self.current_env.depth)
+                    return self.readVariable(name)
                 case NodeType.BinaryOperationExpression:
                     return self.evaluateBinary(node)
+                case NodeType.Assignment:
+                    return self.evaluateAssignment(node)
+                case NodeType.Cast:
+                    return castValue(node.ctype, self.evaluateExpression(node.children["Operand"]))
                 case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression:
                     return self.evaluateUnary(node)
                 case NodeType.Parenthetical:
                     return self.evaluateExpression(node.children["Group"])
-                case NodeType.ChainExpression:
+                case NodeType.ChainExpression | NodeType.FunctionCall | NodeType.Subscript | NodeType.MemberSelection:
                     return self.evaluateChainExpression(node)
                 case _:
                     raise NotImplementedError(f"Unsupported expression type: {node_type}")
       
     @trace
     def evaluateConditional(self, node):
-        pass
+        if node.is_loop:
+            return self.evaluateLoop(node)
+        if self.getTruthyFalsey(self.evaluateExpression(node.children["If"])):
+            return self.evaluateStatement(node.children["Then"])
+        if "Else" in node.children:
+            return self.evaluateStatement(node.children["Else"])
+        
+    @trace
+    def evaluateReturn(self, node):
+        if node.tail_call:
+            call = node.children["Ret"]
+            function = call.function or self.resolveCallee(call)
+            if function.__class__ is Function:
+                self.tail_call = (function, [self.evaluateExpression(argument) for argument in call.arguments])
+                self.returning = True
+                self.unwinding = True
+                return
+        self.return_value = self.evaluateExpression(node.children["Ret"]) if "Ret" in node.children else None
+        self.returning = True
+        self.unwinding = True
+        
+        
+    # Loops
+    #   the body's statements run directly in the enclosing frame, so an
+    #   iteration allocates no scope, and the condition and step are compiled
+    #   to closures once. break and continue set flags like return does. A
+    #   loop over arrays may run as a single NumPy operation instead
+    
+    @trace
+    def evaluateLoop(self, node):
+        if self.frame_base is None:
+            return self.runTopLevelLoop(node)
+        if node.body is None:
+            self.prepareLoop(node)
+            
+        if "Init" in node.children:
+            self.evaluateStatement(node.children["Init"])
+        if node.vector is not None and node.vector.run(self):
+            return
+            
+        body = node.body
+        condition = node.condition
+        advance = node.advance
+        evaluateStatements = self.evaluateStatements
+        while condition():
+            evaluateStatements(body)
+            if self.unwinding:
+                if self.returning:
+                    break
+                self.unwinding = False
+                if self.breaking:
+                    self.breaking = False
+                    break
+                self.continuing = False
+            if advance is not None:
+                advance()
+                
+    def prepareLoop(self, node):
+        body = node.children["Then"]
+        node.body = list(body.children.values()) if body.node_type == NodeType.CompoundStatement else [body]
+        node.condition = self.compileExpression(node.children["If"]) if "If" in node.children else lambda: 1
+        node.advance = self.compileExpression(node.children["Step"]) if "Step" in node.children else None
+        if self.vectorize:
+            node.vector = matchVectorLoop(node)
+        
+    # A loop outside of any function gets a frame of its own, laid out like a
+    #   function body on first execution
+    def runTopLevelLoop(self, node):
+        if node.frame_size is None:
+            self.beginLayout(Environment(self.current_env, "Loop"), self.current_env.depth, node)
+            self.layoutNode(node)
+            node.frame_size = self.frame_size
+            node.register_count = self.register_count
+            self.layout_env = None
+            
+        frame_base = self.stack.push(node.frame_size)
+        self.frame_base = frame_base
+        self.registers = [0] * node.register_count
+        try:
+            self.runWithHostRecursion(self.evaluateLoop, node)
+        finally:
+            self.frame_base = None
+            self.registers = None
+            self.stack.pop(frame_base)
+            
+    # Precompiled expressions
+    #   turns an expression into a closure over its operands, for the shapes
+    #   loop heads are made of: literals, scalar variables, typed arithmetic
+    #   and comparisons, increments and assignments. Anything else compiles
+    #   to a call of evaluateExpression on the node
+    
+    def compileExpression(self, node):
+        memory = self.memory
+        match node.node_type:
+            case NodeType.IntLiteral | NodeType.FloatLiteral:
+                value = node.value
+                return lambda: value
+            case NodeType.Parenthetical:
+                return self.compileExpression(node.children["Group"])
+            case NodeType.RegisterIdentifier:
+                slot = node.slot
+                return lambda: self.registers[slot]
+            case NodeType.LocalIdentifier | NodeType.GlobalIdentifier if node.format is not None:
+                locate = self.compileAddress(node)
+                format = node.format
+                return lambda: memory.load(locate(), format)
+            case NodeType.BinaryOperationExpression | NodeType.TypedBinaryOperationExpression:
+                operation = self.typedOperation(node)
+                if operation is not None:
+                    left = self.compileExpression(node.children["LeftOperand"])
+                    right = self.compileExpression(node.children["RightOperand"])
+                    return lambda: operation(left(), right())
+            case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if node.name in ("++", "--"):
+                operand = node.children["Operand"]
+                if operand.node_type == NodeType.RegisterIdentifier:
+                    return self.compileRegisterIncrement(node, operand)
+                if operand.format is not None and operand.node_type in (NodeType.LocalIdentifier, NodeType.GlobalIdentifier):
+                    return self.compileIncrement(node, operand)
+            case NodeType.Assignment:
+                lvalue = node.children["LValue"]
+                if lvalue.node_type == NodeType.RegisterIdentifier:
+                    return self.compileRegisterAssignment(node, lvalue)
+                if lvalue.format is not None and lvalue.node_type in (NodeType.LocalIdentifier, NodeType.GlobalIdentifier):
+                    return self.compileAssignment(node, lvalue)
+        return lambda: self.evaluateExpression(node)
+    
+    def compileAddress(self, node):
+        if node.node_type == NodeType.GlobalIdentifier:
+            address = node.address
+            return lambda: address
+        offset = node.offset
+        return lambda: self.frame_base + offset
+    
+    # Operation of a binary node whose operand types the TypeChecker resolved
+    def typedOperation(self, node):
+        if node.node_type == NodeType.TypedBinaryOperationExpression:
+            return node.operation
+        if node.name not in INT_BINARY_OPERATIONS:
+            return None
+        left_ctype = decayType(node.children["LeftOperand"].ctype)
+        right_ctype = decayType(node.children["RightOperand"].ctype)
+        if not (isScalarType(left_ctype) and isScalarType(right_ctype)):
+            return None
+        if left_ctype == PrimitiveType.FLOAT:
+            return FLOAT_BINARY_OPERATIONS[node.name]
+        return INT_BINARY_OPERATIONS[node.name]
+    
+    def compileIncrement(self, node, operand):
+        memory = self.memory
+        locate = self.compileAddress(operand)
+        format = operand.format
+        step = node.step if node.name == "++" else -node.step
+        
+        if node.node_type == NodeType.PrefixUnaryExpression:
+            def increment():
+                address = locate()
+                memory.store(address, format, memory.load(address, format) + step)
+                return memory.load(address, format)
+        else:
+            def increment():
+                address = locate()
+                value = memory.load(address, format)
+                memory.store(address, format, value + step)
+                return value
+        return increment
+    
+    def compileAssignment(self, node, lvalue):
+        memory = self.memory
+        locate = self.compileAddress(lvalue)
+        format = lvalue.format
+        rvalue = self.compileExpression(node.children["RValue"])
+        
+        if node.name == "=":
+            def assign():
+                address = locate()
+                memory.store(address, format, rvalue())
+                return memory.load(address, format)
+        else:
+            operation = node.name[:-1]
+            conversion = node.conversion
+            def assign():
+                address = locate()
+                value = applyBinaryOperation(operation, memory.load(address, format), rvalue())
+                if conversion:
+                    value = castValue(conversion, value)
+                memory.store(address, format, value)
+                return memory.load(address, format)
+        return assign
+            
+    def compileRegisterIncrement(self, node, operand):
+        slot = operand.slot
+        convert = STORED_VALUE_CONVERTERS[operand.format]
+        step = node.step if node.name == "++" else -node.step
+        
+        if node.node_type == NodeType.PrefixUnaryExpression:
+            def increment():
+                registers = self.registers
+                registers[slot] = value = convert(registers[slot] + step)
+                return value
+        else:
+            def increment():
+                registers = self.registers
+                value = registers[slot]
+                registers[slot] = convert(value + step)
+                return value
+        return increment
+    
+    def compileRegisterAssignment(self, node, lvalue):
+        slot = lvalue.slot
+        convert = STORED_VALUE_CONVERTERS[lvalue.format]
+        rvalue = self.compileExpression(node.children["RValue"])
+        
+        if node.name == "=":
+            def assign():
+                self.registers[slot] = value = convert(rvalue())
+                return value
+        else:
+            operation = node.name[:-1]
+            conversion = node.conversion
+            def assign():
+                registers = self.registers
+                value = applyBinaryOperation(operation, registers[slot], rvalue())
+                if conversion:
+                    value = castValue(conversion, value)
+                registers[slot] = value = convert(value)
+                return value
+        return assign
+            
+    def evaluateJump(self, node):
+        if node.node_type == NodeType.BreakStatement:
+            self.breaking = True
+        else:
+            self.continuing = True
+        self.unwinding = True
 
     
     @trace
     def evaluateFunction(self, node):
         
         assert_equals(self.lex, "Expected function signature and body (declaration)", node.node_type, NodeType.Function)
+        
+        if "Body" in node.children:
+            if node.name in self.function_map:
+                raise RuntimeError(self.lex, f"Redefinition of function '{node.name}'")
+            self.layoutFunction(node)
+            node.statements = list(node.children["Body"].children.values())
+            self.function_map[node.name] = node
+            if self.memoize and node.pure:
+                self.memoizeFunction(node)
             
+            
+    # Frame layout
+    #   every parameter and local of a function gets a fixed offset in the
+    #   function's frame, so a call bump-allocates the whole frame on the stack
+    #   at once and identifiers address their storage directly instead of
+    #   searching environments. Locals of sibling blocks do not share storage
+    #
+    #   escape analysis keeps the scalars whose address is never taken out of
+    #   memory altogether, in registers: a Python list per frame indexed by
+    #   slot. Arrays, structs and address-taken scalars stay in the frame
+    
+    def beginLayout(self, layout_env, global_depth, scope):
+        self.frame_size = 0
+        self.register_count = 0
+        self.layout_env = layout_env
+        self.frame_escapes = False
+        self.tail_returns = []
         
+        # Names resolved at or above this depth are not in the frame but at
+        #   a fixed address
+        self.global_depth = global_depth
+        
+        # Declarations of the variables whose address is taken, without the
+        #   TypeChecker linking names to declarations every local is in memory
+        self.addressed = self.addressedDeclarations(scope, set()) if self.typechecked else None
+    
+    def addressedDeclarations(self, node, addressed):
+        if node.node_type == NodeType.PrefixUnaryExpression and node.name == "&":
+            addressed.add(assignedDeclaration(node.children["Operand"]))
+        for child in node.children.values():
+            self.addressedDeclarations(child, addressed)
+        return addressed
     
+    def layoutFunction(self, node):
+        self.beginLayout(Environment(self.current_env, node.name), 0, node.children["Body"])
+        
+        node.parameter_slots = []
+        for parameter in node.arguments:
+            identifier = self.declaredIdentifier(parameter.children["Decl1"])
+            type = parameter.ctype or self.declaredType(parameter, identifier)
+            location = self.allocateLocal(identifier, type, parameter)
+            convert = STORED_VALUE_CONVERTERS[identifier.format] if identifier.node_type == NodeType.RegisterIdentifier else None
+            node.parameter_slots.append((location, identifier.format, type, convert))
+            
+        self.layoutNode(node.children["Body"])
+        node.frame_size = self.frame_size
+        node.register_count = self.register_count
+        self.layout_env = None
+        
+        # A tail call reuses the frame, only safe when no pointer into the
+        #   frame can reach the called function, so functions that take an
+        #   address or hold arrays or structs (passed around by address) keep
+        #   plain calls
+        if not self.frame_escapes:
+            for return_statement in self.tail_returns:
+                return_statement.tail_call = True
+        
+    def allocateSlot(self, type):
+        align = alignOf(type)
+        offset = (self.frame_size + align - 1) & -align
+        self.frame_size = offset + sizeOf(type)
+        return offset
+    
+    # Allocates the variable `declaration` declares, returns its frame offset
+    #   or register slot
+    def allocateLocal(self, identifier, type, declaration):
+        if isAggregateType(type):
+            self.frame_escapes = True
+        
+        if self.addressed is not None and isScalarType(type) and declaration not in self.addressed:
+            storage = (NodeType.RegisterIdentifier, self.register_count)
+            self.register_count += 1
+        else:
+            storage = (NodeType.LocalIdentifier, self.allocateSlot(type))
+        
+        self.layout_env.insert_mapping(identifier.name, type, storage)
+        self.bindIdentifier(identifier, *storage, type)
+        return storage[1]
+    
+    def bindIdentifier(self, identifier, node_type, location, type):
+        identifier.node_type = node_type
+        identifier.ctype = type
+        identifier.format = None if isAggregateType(type) else scalarFormat(type)
+        match node_type:
+            case NodeType.LocalIdentifier:
+                identifier.offset = location
+            case NodeType.RegisterIdentifier:
+                identifier.slot = location
+            case NodeType.GlobalIdentifier:
+                identifier.address = location
+        
+    def layoutNode(self, node):
+        match node.node_type:
+            case NodeType.CompoundStatement:
+                self.layout_env = Environment(self.layout_env)
+                for child in list(node.children.values()):
+                    self.layoutNode(child)
+                self.layout_env = self.layout_env.parent_env
+            case NodeType.ConditionalStatement if node.is_loop:
+                # Declarations in a `for` head are scoped to the loop
+                self.layout_env = Environment(self.layout_env)
+                for child in list(node.children.values()):
+                    self.layoutNode(child)
+                self.layout_env = self.layout_env.parent_env
+            case NodeType.Declaration:
+                for declarator in list(node.children.values()):
+                    identifier = self.declaredIdentifier(declarator)
+                    self.allocateLocal(identifier, self.declaredType(node, identifier), declarator)
+                    if declarator.node_type == NodeType.Assignment:
+                        self.layoutNode(declarator.children["RValue"])
+            case NodeType.Identifier:
+                (location, type, depth) = self.layout_env.get_mapping(node.name)
+                if depth is None:
+                    pass
+                elif depth <= self.global_depth:
+                    self.bindIdentifier(node, NodeType.GlobalIdentifier, location, type)
+                else:
+                    self.bindIdentifier(node, *location, type)
+            case NodeType.MemberSelection:
+                self.layoutNode(node.children["Object"])
+            case NodeType.PrefixUnaryExpression if node.name == "&":
+                self.frame_escapes = True
+                self.layoutNode(node.children["Operand"])
+            case NodeType.Assignment | NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if node.name not in ("-", "!", "*"):
+                # Written variables are accessed by storage kind, not by address
+                target = "LValue" if node.node_type == NodeType.Assignment else "Operand"
+                while node.children[target].node_type == NodeType.Parenthetical:
+                    node.children[target] = node.children[target].children["Group"]
+                for child in list(node.children.values()):
+                    self.layoutNode(child)
+            case NodeType.ReturnStatement:
+                returned = node.children.get("Ret")
+                if returned is not None and returned.node_type == NodeType.FunctionCall and returned.ctype.__class__ is not StructType:
+                    self.tail_returns.append(node)
+                for child in list(node.children.values()):
+                    self.layoutNode(child)
+            case NodeType.FunctionCall:
+                if isinstance(node.ctype, StructType):
+                    node.result_offset = self.allocateSlot(node.ctype)
+                for (key, child) in list(node.children.items()):
+                    if key != "Callee":
+                        self.layoutNode(child)
+            case _:
+                for child in list(node.children.values()):
+                    self.layoutNode(child)
     
       
     @trace
-    def evaluateStatment(self, node):
+    def evaluateStatement(self, node):
         statement_type = node.node_type
         match statement_type:
             case NodeType.ExpressionStatement:
-                return self.evaluateExpression(node)
+                return self.evaluateExpression(node.children["Expression"])
+            case NodeType.CompoundStatement:
+                return self.evaluateCompoundStatement(node)
             case NodeType.ConditionalStatement:
                 return self.evaluateConditional(node)
             case NodeType.Declaration:
@@ -145,52 +834,60 @@ class Interpreter:
                 if self.current_env.depth != 0:
                     raise RuntimeError(self.lex, "Illegal nesting of function declarations. Function declarations only allowed at top-level")
                 return self.evaluateFunction(node)
+            case NodeType.Struct:
+                return None
+            case NodeType.ReturnStatement:
+                return self.evaluateReturn(node)
+            case NodeType.BreakStatement | NodeType.ContinueStatement:
+                return self.evaluateJump(node)
             case _:
                 raise RuntimeError(self.lex, "Unrecognized statement type")
                 
     @trace
     def evaluateCompoundStatement(self, node):
-        self.newEnvironment()
+        # Inside functions locals are already laid out in the frame
+        top_level = self.frame_base is None
+        if top_level:
+            self.newEnvironment()
         
         if node.node_type == NodeType.CompoundStatement:
-            for i in range(len(node.children)):
-                statement = node.children[f"Statement{i+1}"]
+            self.evaluateStatements(node.children.values())
                 
-                self.evaluateStatement(statement)
+        if top_level:
+            self.current_env = self.current_env.parent_env
+        
+    def evaluateStatements(self, statements):
+        for statement in statements:
+            self.evaluateStatement(statement)
+            if self.unwinding:
+                break
         
     @trace
     def evaluateBooleanComparison(self, lhs, rhs, operation):
         match operation:
             case "||":
                 if self.getTruthyFalsey(self.evaluateExpression(lhs)):
-                    return True
-                return self.getTruthyFalsey(self.evaluateExpression(rhs))
+                    return 1
+                return 1 if self.getTruthyFalsey(self.evaluateExpression(rhs)) else 0
             
             case "&&":
                 if not self.getTruthyFalsey(self.evaluateExpression(lhs)):
-                    return False
-                return self.getTruthyFalsey(self.evaluateExpression(rhs))
+                    return 0
+                return 1 if self.getTruthyFalsey(self.evaluateExpression(rhs)) else 0
             
     @trace       
-    def evaluateArithmeticComparison(self, lhs, rhs, operation):
+    def evaluateArithmeticComparison(self, node, lhs, rhs, operation):
         left_val = self.evaluateExpression(lhs)
         right_val = self.evaluateExpression(rhs)
-        match operation:
-            case "<":   return left_val < right_val
-            case "<=":  return left_val <= right_val
-            case ">":   return left_val > right_val
-            case ">=":  return left_val >= right_val
+        self.quickenBinary(node, left_val, right_val)
+        return applyBinaryOperation(operation, left_val, right_val)
             
     @trace        
-    def evaluateArithmeticOperation(self, lhs, rhs, operation):
+    def evaluateArithmeticOperation(self, node, lhs, rhs, operation):
         left_val = self.evaluateExpression(lhs)
         right_val = self.evaluateExpression(rhs)
-        match operation:
-            case "+":  return left_val + right_val
-            case "-":  return left_val - right_val
-            case "*":  return left_val * right_val
-            case "/":  return left_val / right_val
-            case "%":  return left_val % right_val
+        self.quickenBinary(node, left_val, right_val)
+        return applyBinaryOperation(operation, left_val, right_val)
             
     @trace   
     def evaluateBinary(self, node):
@@ -202,49 +899,116 @@ class Interpreter:
             match operation:
                 case "||" | "&&":
                     return self.evaluateBooleanComparison(lhs, rhs, operation)
-                case "<" | "<=" | ">" | ">=":
-                    return self.evaluateArithmeticComparison(lhs, rhs, operation)
+                case "<" | "<=" | ">" | ">=" | "==" | "!=":
+                    return self.evaluateArithmeticComparison(node, lhs, rhs, operation)
                 case "+" | "-" | "*" | "/" | "%":
-                    return self.evaluateArithmeticOperation(lhs, rhs, operation)
+                    return self.evaluateArithmeticOperation(node, lhs, rhs, operation)
             
             raise RuntimeError(self.lex, "Invalid binary expression")
         raise RuntimeError(self.lex, "Expected binary expression")
+    
+    
+    # Quickening
+    #   a generic binary node rewrites itself, after executing, into a variant
+    #   specialized on the operand types it just saw. Specialized variants skip
+    #   the operator dispatch and re-check only their type guard, falling back
+    #   to the generic node when the guard fails. Nodes whose operand types
+    #   were resolved by the TypeChecker become unguarded typed nodes instead
+    
+    def quickenBinary(self, node, left_val, right_val):
+        if node.deopt_count >= QUICKEN_DEOPT_LIMIT:
+            return
+        
+        left_ctype = decayType(node.children["LeftOperand"].ctype)
+        right_ctype = decayType(node.children["RightOperand"].ctype)
+        if isScalarType(left_ctype) and isScalarType(right_ctype):
+            node.node_type = NodeType.TypedBinaryOperationExpression
+            if left_ctype == PrimitiveType.FLOAT:
+                node.operation = FLOAT_BINARY_OPERATIONS[node.name]
+            else:
+                node.operation = INT_BINARY_OPERATIONS[node.name]
+            return
+        
+        left_type = type(left_val)
+        right_type = type(right_val)
+        
+        if left_type is int and right_type is int:
+            node.node_type = NodeType.IntBinaryOperationExpression
+            node.operation = INT_BINARY_OPERATIONS[node.name]
+        elif left_type is float and right_type is float:
+            node.node_type = NodeType.FloatBinaryOperationExpression
+            node.operation = FLOAT_BINARY_OPERATIONS[node.name]
+        elif left_type in (int, float) and right_type in (int, float):
+            node.node_type = NodeType.MixedBinaryOperationExpression
+            node.operation = FLOAT_BINARY_OPERATIONS[node.name]
+            
+    def deoptimizeBinary(self, node, left_val, right_val):
+        node.node_type = NodeType.BinaryOperationExpression
+        node.operation = None
+        node.deopt_count += 1
+        return applyBinaryOperation(node.name, left_val, right_val)
+    
+    def evaluateIntBinary(self, node):
+        left_val = self.evaluateExpression(node.children["LeftOperand"])
+        right_val = self.evaluateExpression(node.children["RightOperand"])
+        if type(left_val) is int and type(right_val) is int:
+            return node.operation(left_val, right_val)
+        return self.deoptimizeBinary(node, left_val, right_val)
+    
+    def evaluateFloatBinary(self, node):
+        left_val = self.evaluateExpression(node.children["LeftOperand"])
+        right_val = self.evaluateExpression(node.children["RightOperand"])
+        if type(left_val) is float and type(right_val) is float:
+            return node.operation(left_val, right_val)
+        return self.deoptimizeBinary(node, left_val, right_val)
+    
+    def evaluateMixedBinary(self, node):
+        left_val = self.evaluateExpression(node.children["LeftOperand"])
+        right_val = self.evaluateExpression(node.children["RightOperand"])
+        left_type = type(left_val)
+        right_type = type(right_val)
+        if (left_type is float and right_type is int) or (left_type is int and right_type is float):
+            return node.operation(left_val, right_val)
+        return self.deoptimizeBinary(node, left_val, right_val)
                     
     @trace 
-    def evaluatePrefixExpression(self, operand, operator):
+    def evaluatePrefixExpression(self, node, operand, operator):
         match operator:
             case "!":
-                return not self.getTruthyFalsey(self.evaluateExpression(operand))
+                return 0 if self.getTruthyFalsey(self.evaluateExpression(operand)) else 1
             case "-":
                 return -(self.evaluateExpression(operand))
                 
             case "*":
-                return self.dereference(operand)
+                return self.memory.loadValue(self.evaluateExpression(operand), self.accessType(node))
                 
             case "&":
-                return self.addressOf(operand)
-                
-            case "++":
-                result = self.evaluate(operand) + 1
-                self.updateVariable(operand, result)
-                return result
+                return self.evaluateAddress(operand)
                 
-            case "--":
-                result = self.evaluate(operand) - 1
-                self.updateVariable(operand, result)
-                return result
+            case "++" | "--":
+                step = node.step if operator == "++" else -node.step
+                if operand.node_type == NodeType.RegisterIdentifier:
+                    value = STORED_VALUE_CONVERTERS[operand.format](self.registers[operand.slot] + step)
+                    self.registers[operand.slot] = value
+                    return value
+                address = self.evaluateAddress(operand)
+                type = self.lvalueType(operand)
+                self.memory.storeValue(address, type, self.memory.loadValue(address, type) + step)
+                return self.memory.loadValue(address, type)
                 
     @trace 
-    def evaluatePostfixExpression(self, operand, operator):
+    def evaluatePostfixExpression(self, node, operand, operator):
         match operator:
-            case "++":
-                result = self.evaluate(operand)
-                self.updateVariable(operand, result + 1)
-                return result
-                
-            case "--":
-                result = self.evaluate(operand)
-                self.updateVariable(operand, result - 1)
+            case "++" | "--":
+                step = node.step if operator == "++" else -node.step
+                if operand.node_type == NodeType.RegisterIdentifier:
+                    result = self.registers[operand.slot]
+                    self.registers[operand.slot] = STORED_VALUE_CONVERTERS[operand.format](result + step)
+                    return result
+                address = self.evaluateAddress(operand)
+                type = self.lvalueType(operand)
+                result = self.memory.loadValue(address, type)
+                self.memory.storeValue(address, type, result + step)
                 return result
     
     @trace 
@@ -254,13 +1018,13 @@ class Interpreter:
                 operand = node.children["Operand"]
                 operator = node.name
                 
-                return self.evaluatePrefixExpression(operand, operator)
+                return self.evaluatePrefixExpression(node, operand, operator)
                 
             case NodeType.PostfixUnaryExpression:
                 operand = node.children["Operand"]
                 operator = node.name
                 
-                return self.evaluatePostfixExpression(operand, operator)
+                return self.evaluatePostfixExpression(node, operand, operator)
                 
             case NodeType.UnaryOperationExpression:
                 pass
@@ -275,10 +1039,34 @@ class Interpreter:
     def evaluateAssignment(self, node):
         
         if node.node_type == NodeType.Assignment:
-            self.current_env.update_mapping()
+            lvalue = node.children["LValue"]
+            if lvalue.node_type == NodeType.RegisterIdentifier:
+                return self.assignRegister(node, lvalue)
+            address = self.evaluateAddress(lvalue)
+            type = self.lvalueType(lvalue)
+            value = self.evaluateExpression(node.children["RValue"])
+            
+            if node.name != "=":
+                value = applyBinaryOperation(node.name[:-1], self.memory.loadValue(address, type), value)
+                if node.conversion:
+                    value = castValue(node.conversion, value)
+            
+            # The value of an assignment is the converted value that was stored
+            self.memory.storeValue(address, type, value)
+            return self.memory.loadValue(address, type)
             
         raise RuntimeError(self.lex, "Expected assignment")
     
+    def assignRegister(self, node, lvalue):
+        value = self.evaluateExpression(node.children["RValue"])
+        if node.name != "=":
+            value = applyBinaryOperation(node.name[:-1], self.registers[lvalue.slot], value)
+            if node.conversion:
+                value = castValue(node.conversion, value)
+        value = STORED_VALUE_CONVERTERS[lvalue.format](value)
+        self.registers[lvalue.slot] = value
+        return value
+    
     
     @trace
     def evaluateDeclaration(self, node):
@@ -287,15 +1075,85 @@ class Interpreter:
             
             for i in range(len(node.children)):
                 declaration = node.children[f"Decl{i+1}"]
+                identifier = self.declaredIdentifier(declaration)
+                type = self.declaredType(node, identifier)
                 
-                match declaration.node_type:
-                    case NodeType.Identifier:
-                        self.declareVariable(declaration.name, node.type, None)
-                    case NodeType.Assignment:
-                        self.declareVariable(declaration.children["LValue"].name, node.type, self.evaluateExpression(declaration.children["RValue"]))
+                if identifier.node_type == NodeType.RegisterIdentifier:
+                    if declaration.node_type == NodeType.Assignment:
+                        value = self.evaluateExpression(declaration.children["RValue"])
+                        self.registers[identifier.slot] = STORED_VALUE_CONVERTERS[identifier.format](value)
+                    continue
+                if identifier.node_type == NodeType.LocalIdentifier:
+                    address = self.frame_base + identifier.offset
+                    # Scalar locals store their initializer's value directly
+                    if identifier.format is not None and declaration.node_type == NodeType.Assignment:
+                        self.memory.store(address, identifier.format, self.evaluateExpression(declaration.children["RValue"]))
+                        continue
+                else:
+                    address = self.declareVariable(identifier.name, type)
+                
+                if declaration.node_type == NodeType.Assignment:
+                    self.storeInitializer(address, type, declaration.children["RValue"])
                         
         if self.debug: print(self.current_env)
         
+    # The declared identifier sits under the declarator's pointer and array
+    #   suffixes and carries the full type resolved by the TypeChecker
+    def declaredIdentifier(self, declarator):
+        derived = False
+        while declarator.node_type not in (NodeType.Identifier, NodeType.LocalIdentifier, NodeType.RegisterIdentifier):
+            match declarator.node_type:
+                case NodeType.Assignment:
+                    declarator = declarator.children["LValue"]
+                case NodeType.PrefixUnaryExpression:
+                    declarator = declarator.children["Operand"]
+                    derived = True
+                case NodeType.Subscript:
+                    declarator = declarator.children["Locator"]
+                    derived = True
+                case NodeType.Parenthetical:
+                    declarator = declarator.children["Group"]
+                case _:
+                    raise RuntimeError(self.lex, "Invalid declarator")
+        # Pointer and array types are only known after type checking
+        if derived and declarator.ctype is None:
+            raise RuntimeError(self.lex, f"Declaration of '{declarator.name}' requires type checking")
+        return declarator
+    
+    def declaredType(self, node, identifier):
+        if identifier.ctype is None:
+            type = getTypeFromString(node.type)
+            if not type:
+                raise RuntimeError(self.lex, f"Declaration of '{identifier.name}' requires type checking")
+            return type
+        return identifier.ctype
+    
+    def storeInitializer(self, address, type, node):
+        match node.node_type:
+            case NodeType.ArrayLiteral:
+                self.memory.fill(address, sizeOf(type))
+                if isinstance(type, ArrayType):
+                    element_size = sizeOf(type.element)
+                    for i in range(len(node.children)):
+                        self.storeInitializer(address + i * element_size, type.element, node.children[f"Element{i+1}"])
+                else:
+                    offsets = layoutStruct(type).offsets
+                    for (i, (field, field_type)) in enumerate(type.fields.items()):
+                        if i == len(node.children):
+                            break
+                        self.storeInitializer(address + offsets[field], field_type, node.children[f"Element{i+1}"])
+            case NodeType.StringLiteral if isinstance(type, ArrayType):
+                encoded = node.value.encode("utf-8")[:type.length]
+                self.memory.fill(address, type.length)
+                self.memory.writeBytes(address, encoded)
+            case _:
+                self.memory.storeValue(address, type, self.evaluateExpression(node))
+        
+        
+    def run(self):
+        self.evaluateModule(self.ast)
+        if "main" in self.function_map:
+            return self.executeFunction("main", [])
         
     @trace
     def evaluateModule(self, node):
@@ -304,5 +1162,4 @@ class Interpreter:
             for i in range(len(node.children)):
                 statement = node.children[f"Statement{i+1}"]
                 
-                
-            
\ No newline at end of file
+                self.evaluateStatement(statement)
@@ -45,6 +45,9 @@ class Lexer:
         })
         
         
+    def discard_state(self):
+        self.state.pop()
+        
     def resume_state(self):
         current_state = self.state.pop()
         self.file_pos = current_state["file_pos"]
@@ -80,6 +83,7 @@ class Lexer:
     
     
     def match(self, string):
+        self.skip_whitespace()
         n = len(string)
         actual = self.peek(n)
         return actual == string
@@ -92,7 +96,18 @@ class Lexer:
         return None
 
 
+    # Like match_any, but only for whole words, so `format` does not match `for`
+    def match_keyword(self, keywords):
+        for keyword in keywords:
+            if self.match(keyword):
+                following = self.peek(len(keyword) + 1)
+                if following is None or not alphanum(following[-1]):
+                    return keyword
+        return None
+
+
     def expect(self, string):
+        self.skip_whitespace()
         n = len(string)
         actual = self.peek(n)
         if actual != string:
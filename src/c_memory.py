@@ -0,0 +1,356 @@
+import builtins
+
+from c_error import *
+from c_types import *
+
+DEFAULT_MEMORY_SIZE = 8 * 1024
+
+# Addresses below this are never handed out, so NULL and small offsets from it fault
+NULL_GUARD = 16
+
+# Element shift for each typed view, an aligned address `a` of format `f` is
+#   element `a >> FORMAT_SHIFTS[f]` of `views[f]`
+FORMAT_SHIFTS = {
+    "b": 0,
+    "B": 0,
+    "i": 2,
+    "f": 2,
+    "Q": 3,
+}
+
+FORMAT_RANGES = {
+    "b": (-(1 << 7), 1 << 8),
+    "B": (0, 1 << 8),
+    "i": (-(1 << 31), 1 << 32),
+    "Q": (0, 1 << 64),
+}
+
+
+# Two's complement wrap-around of an integer that does not fit the format
+def wrapValue(format, value):
+    (low, span) = FORMAT_RANGES[format]
+    return (int(value) - low) % span + low
+
+
+# Conversion of a value to what it reads back as once stored in the given
+#   format, for scalars kept outside of memory
+def storedValueConverter(format):
+    if format == "f":
+        scratch = memoryview(bytearray(4)).cast("f")
+        def convert(value):
+            scratch[0] = value
+            return scratch[0]
+        return convert
+    
+    (low, span) = FORMAT_RANGES[format]
+    high = low + span
+    def convert(value):
+        if low <= value < high:
+            return value
+        return (int(value) - low) % span + low
+    return convert
+
+STORED_VALUE_CONVERTERS = {format: storedValueConverter(format) for format in FORMAT_SHIFTS}
+
+
+# Flat byte-addressable memory
+#   a single `bytearray` holds every object, pointers are integer offsets into
+#   it and typed `memoryview` casts give direct int/float/char access. Objects
+#   are laid out with natural alignment so every scalar is one view element
+
+class Memory:
+
+    def __init__(self, size = DEFAULT_MEMORY_SIZE):
+        self.size = (size + 7) & -8
+        self.data = bytearray(self.size)
+        self.top = NULL_GUARD
+
+        self.view = None
+        self.views = {}
+        self.makeViews()
+
+    def makeViews(self):
+        self.view = memoryview(self.data)
+        self.views = {format: self.view.cast(format) for format in FORMAT_SHIFTS}
+
+    def releaseViews(self):
+        for view in self.views.values():
+            view.release()
+        self.view.release()
+
+    # The bytearray cannot be resized while views export it
+    def grow(self, minimum_size):
+        new_size = max(self.size * 2, (minimum_size + 7) & -8)
+        self.releaseViews()
+        self.data.extend(bytes(new_size - self.size))
+        self.size = new_size
+        self.makeViews()
+
+    def allocate(self, size, align = 8):
+        address = (self.top + align - 1) & -align
+        end = address + size
+        if end > self.size:
+            self.grow(end)
+        self.top = end
+        return address
+
+    def fault(self, address):
+        raise RuntimeError(None, f"Segmentation fault: invalid access at address {address:#x}")
+
+
+    # Scalar access
+
+    def load(self, address, format):
+        if address < NULL_GUARD:
+            self.fault(address)
+        try:
+            return self.views[format][address >> FORMAT_SHIFTS[format]]
+        except IndexError:
+            self.fault(address)
+
+    def store(self, address, format, value):
+        if address < NULL_GUARD:
+            self.fault(address)
+        try:
+            self.views[format][address >> FORMAT_SHIFTS[format]] = value
+        except IndexError:
+            self.fault(address)
+        except builtins.ValueError:
+            self.views[format][address >> FORMAT_SHIFTS[format]] = wrapValue(format, value)
+
+    def loadValue(self, address, type):
+        if isAggregateType(type):
+            return address
+        return self.load(address, scalarFormat(type))
+
+    def storeValue(self, address, type, value):
+        if isinstance(type, StructType):
+            self.copy(address, value, sizeOf(type))
+        else:
+            self.store(address, scalarFormat(type), value)
+
+
+    # Bulk access, each a single slice operation on the underlying bytearray
+
+    def checkRange(self, address, size):
+        if address < NULL_GUARD or address + size > self.size:
+            self.fault(address)
+
+    def copy(self, destination, source, size):
+        self.checkRange(destination, size)
+        self.checkRange(source, size)
+        self.data[destination:destination + size] = self.data[source:source + size]
+
+    def fill(self, address, size, byte = 0):
+        self.checkRange(address, size)
+        self.data[address:address + size] = bytes((byte,)) * size
+
+    def readBytes(self, address, size):
+        self.checkRange(address, size)
+        return bytes(self.data[address:address + size])
+
+    def writeBytes(self, address, data):
+        self.checkRange(address, len(data))
+        self.data[address:address + len(data)] = data
+
+    def readString(self, address):
+        self.checkRange(address, 0)
+        end = self.data.find(0, address)
+        if end < 0:
+            self.fault(self.size)
+        return self.data[address:end].decode("utf-8", "replace")
+
+    def allocateString(self, string):
+        encoded = string.encode("utf-8") + b"\0"
+        address = self.allocate(len(encoded), 1)
+        self.writeBytes(address, encoded)
+        return address
+
+
+# Call stack arena
+#   a fixed-size region reserved at the bottom of memory, a call bump-allocates
+#   its whole frame and returning pops it by resetting the stack pointer. Being
+#   allocated first, the region never moves when the rest of memory grows
+
+FRAME_ALIGN = 8
+
+class Stack:
+
+    def __init__(self, memory, size):
+        self.memory = memory
+        self.size = (size + FRAME_ALIGN - 1) & -FRAME_ALIGN
+        self.base = memory.allocate(self.size, FRAME_ALIGN)
+        self.limit = self.base + self.size
+        self.pointer = self.base
+
+    # Every frame takes at least one slot, so unbounded recursion always
+    #   exhausts the arena even when the frames hold no locals
+    def push(self, frame_size):
+        address = self.pointer
+        end = address + max(FRAME_ALIGN, (frame_size + FRAME_ALIGN - 1) & -FRAME_ALIGN)
+        if end > self.limit:
+            raise StackOverflowError(None, f"{self.size} byte stack exhausted")
+        self.pointer = end
+        return address
+
+    def pop(self, address):
+        self.pointer = address
+
+    def used(self):
+        return self.pointer - self.base
+
+
+# Heap allocator behind malloc/calloc/realloc/free
+#   small requests are rounded up to a size class and served from a per-class
+#   free list, so allocating and freeing them is a list push/pop. Large blocks
+#   are kept in an address-indexed free map and merged with free neighbours
+#   when released. Fresh blocks are carved from chunks taken from memory
+
+HEAP_ALIGN = 16
+SMALL_BLOCK_LIMIT = 256
+SIZE_CLASSES = SMALL_BLOCK_LIMIT // HEAP_ALIGN
+HEAP_CHUNK_SIZE = 64 * 1024
+
+class Heap:
+
+    def __init__(self, memory, chunk_size = HEAP_CHUNK_SIZE):
+        self.memory = memory
+        self.chunk_size = chunk_size
+
+        # Free lists of small blocks, indexed by size class
+        self.small_free = [[] for _ in range(SIZE_CLASSES + 1)]
+
+        # Free large blocks by start address and by end address, for coalescing
+        self.large_free = {}
+        self.large_free_ends = {}
+
+        # Live blocks, address -> (capacity, requested size)
+        self.blocks = {}
+
+        # Unused tail of the current chunk
+        self.top = 0
+        self.end = 0
+
+        self.heap_size = 0
+        self.in_use = 0
+        self.peak = 0
+
+    def blockSize(self, size):
+        return max(HEAP_ALIGN, (size + HEAP_ALIGN - 1) & -HEAP_ALIGN)
+
+    def carve(self, capacity):
+        if self.top + capacity > self.end:
+            if self.end - self.top >= HEAP_ALIGN:
+                self.release(self.top, self.end - self.top)
+            chunk_size = max(self.chunk_size, capacity)
+            self.top = self.memory.allocate(chunk_size, HEAP_ALIGN)
+            self.end = self.top + chunk_size
+            self.heap_size += chunk_size
+        address = self.top
+        self.top += capacity
+        return address
+
+    def allocate(self, size):
+        if size < 0:
+            return 0
+        capacity = self.blockSize(size)
+
+        if capacity <= SMALL_BLOCK_LIMIT:
+            free_list = self.small_free[capacity // HEAP_ALIGN]
+            address = free_list.pop() if free_list else self.carve(capacity)
+        else:
+            address = self.allocateLarge(capacity)
+
+        self.blocks[address] = (capacity, size)
+        self.in_use += size
+        self.peak = max(self.peak, self.in_use)
+        return address
+
+    # First fit over the free large blocks, splitting off the unused remainder
+    def allocateLarge(self, capacity):
+        for (address, block_size) in self.large_free.items():
+            if block_size >= capacity:
+                self.unlink(address)
+                if block_size > capacity:
+                    self.release(address + capacity, block_size - capacity)
+                return address
+        return self.carve(capacity)
+
+    def unlink(self, address):
+        block_size = self.large_free.pop(address)
+        del self.large_free_ends[address + block_size]
+        return block_size
+
+    # Returns a range to the free lists, merging large ranges with free neighbours
+    def release(self, address, block_size):
+        if block_size <= SMALL_BLOCK_LIMIT and block_size % HEAP_ALIGN == 0:
+            self.small_free[block_size // HEAP_ALIGN].append(address)
+            return
+
+        end = address + block_size
+        if end in self.large_free:
+            end += self.unlink(end)
+        if address in self.large_free_ends:
+            previous = self.large_free_ends[address]
+            self.unlink(previous)
+            address = previous
+
+        self.large_free[address] = end - address
+        self.large_free_ends[end] = address
+
+    def free(self, address):
+        if address == 0:
+            return
+        block = self.blocks.pop(address, None)
+        if block is None:
+            raise RuntimeError(None, f"free(): invalid pointer {address:#x}")
+        (capacity, size) = block
+        self.in_use -= size
+        self.release(address, capacity)
+
+    def reallocate(self, address, size):
+        if address == 0:
+            return self.allocate(size)
+        if address not in self.blocks:
+            raise RuntimeError(None, f"realloc(): invalid pointer {address:#x}")
+
+        (capacity, old_size) = self.blocks[address]
+        if size <= capacity:
+            self.blocks[address] = (capacity, size)
+            self.in_use += size - old_size
+            self.peak = max(self.peak, self.in_use)
+            return address
+
+        # Grow a large block in place into a free neighbour
+        needed = self.blockSize(size)
+        following = address + capacity
+        if capacity > SMALL_BLOCK_LIMIT and capacity + self.large_free.get(following, 0) >= needed:
+            remainder = capacity + self.unlink(following) - needed
+            if remainder:
+                self.release(address + needed, remainder)
+            self.blocks[address] = (needed, size)
+            self.in_use += size - old_size
+            self.peak = max(self.peak, self.in_use)
+            return address
+
+        new_address = self.allocate(size)
+        self.memory.copy(new_address, address, old_size)
+        self.free(address)
+        return new_address
+
+    def stats(self):
+        free_sizes = list(self.large_free.values()) + [self.end - self.top]
+        for (size_class, free_list) in enumerate(self.small_free):
+            free_sizes.extend([size_class * HEAP_ALIGN] * len(free_list))
+        free_bytes = sum(free_sizes)
+        largest = max(free_sizes)
+
+        return {
+            "heap_size": self.heap_size,
+            "in_use": self.in_use,
+            "peak": self.peak,
+            "blocks": len(self.blocks),
+            "free": free_bytes,
+            # Share of free memory not usable by a single allocation of it all
+            "fragmentation": 1 - largest / free_bytes if free_bytes else 0.0,
+        }
@@ -0,0 +1,880 @@
+from c_ast import *
+from c_types import *
+from c_error import *
+from c_parse import trace
+
+import copy
+
+
+# Optimization levels
+#   0 runs the tree as parsed, 1 folds constants and removes dead code,
+#   2 also moves loop invariant expressions out of loops and reuses
+#   repeated expressions in function bodies
+OPTIMIZE_NONE = 0
+OPTIMIZE_BASIC = 1
+OPTIMIZE_FULL = 2
+
+DEFAULT_OPTIMIZE_LEVEL = OPTIMIZE_BASIC
+
+# Largest returned expression, in nodes, of a function inlined at its calls
+INLINE_SIZE_LIMIT = 32
+
+
+# Value of a literal node as the interpreter evaluates it, None if not a constant
+def constantValue(node):
+    match node.node_type:
+        case NodeType.IntLiteral | NodeType.FloatLiteral:
+            return node.value
+        case NodeType.CharacterLiteral:
+            return ord(node.value)
+        case NodeType.BooleanLiteral:
+            return 1 if node.value else 0
+    return None
+
+# Literal replacing `node`, keeping its type and source position
+def makeLiteral(node, value):
+    literal = FloatLiteral(value) if type(value) is float else IntLiteral(value)
+    literal.ctype = node.ctype
+    literal.start = node.start
+    literal.end = node.end
+    return literal
+
+# Operators that cannot fail whatever their operands, expressions built from
+#   them can be evaluated earlier or fewer times without changing the program
+TOTAL_OPERATORS = {"+", "-", "*", "&", "^", "|", "<", "<=", ">", ">=", "==", "!="}
+
+# Identifier a declarator declares, under its pointer and array suffixes
+def declaratorIdentifier(declarator):
+    while declarator.node_type != NodeType.Identifier:
+        match declarator.node_type:
+            case NodeType.Assignment:
+                declarator = declarator.children["LValue"]
+            case NodeType.PrefixUnaryExpression:
+                declarator = declarator.children["Operand"]
+            case NodeType.Subscript:
+                declarator = declarator.children["Locator"]
+            case NodeType.Parenthetical:
+                declarator = declarator.children["Group"]
+    return declarator
+
+# Copy of an expression with the identifiers declared by the keys of
+#   `substitutions` replaced by copies of their values
+def cloneExpression(node, substitutions):
+    if node.node_type == NodeType.Identifier and node.declaration in substitutions:
+        return cloneExpression(substitutions[node.declaration], {})
+    clone = copy.copy(node)
+    clone.children = {key: cloneExpression(child, substitutions) for (key, child) in node.children.items()}
+    return clone
+
+# Declaration of the variable an lvalue writes to, if it is a plain variable
+def assignedDeclaration(node):
+    while node.node_type == NodeType.Parenthetical:
+        node = node.children["Group"]
+    if node.node_type == NodeType.Identifier:
+        return node.declaration
+    return None
+
+
+# Constant folding and dead code elimination
+#   runs between type checking and execution. Operations on constants are
+#   replaced by their result, variables initialized with a constant and never
+#   written afterwards are replaced by that constant, and branches and
+#   statements that can never run are removed. `report` counts the changes
+
+class Optimizer:
+
+    def __init__(self, lex, debug = False):
+        self.lex = lex
+        self.debug = debug
+        self.trace_depth = 0
+
+        self.report = {
+            "folded": 0,
+            "propagated": 0,
+            "branches_removed": 0,
+            "statements_removed": 0,
+            "hoisted": 0,
+            "reused": 0,
+            "inlined": 0,
+            "functions_removed": 0,
+        }
+
+        # Declarations written after their initialization, and the constant
+        #   value of the others
+        self.modified = set()
+        self.constants = {}
+        
+        # Scalar locals of the function being optimized whose address is never
+        #   taken, only assignments visible in its body can change them
+        self.tracked = set()
+        self.temporary_count = 0
+        
+        # Defined functions by name and the names each one calls
+        self.functions = {}
+        self.call_graph = {}
+        self.inlinable = set()
+
+    def optimizeModule(self, node, level = DEFAULT_OPTIMIZE_LEVEL):
+        if node.node_type != NodeType.TranslationUnit:
+            return node
+        if level >= OPTIMIZE_BASIC:
+            self.findModified(node)
+            self.optimizeBlock(node)
+        if level >= OPTIMIZE_FULL:
+            self.inlineModule(node)
+            for function in self.functions.values():
+                self.optimizeFunction(function)
+        if self.debug: print(self.report)
+        return node
+
+
+    # Variables whose value changes after the declaration, assigned,
+    #   incremented or having their address taken anywhere in the program
+
+    def findModified(self, node):
+        match node.node_type:
+            case NodeType.Assignment:
+                self.modified.add(assignedDeclaration(node.children["LValue"]))
+            case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if node.name in ("++", "--", "&"):
+                self.modified.add(assignedDeclaration(node.children["Operand"]))
+        for child in node.children.values():
+            self.findModified(child)
+
+
+    # Statements
+
+    # Optimizes the statements of a block in place, dropping the removed ones
+    #   and everything after a return, break or continue
+    def optimizeBlock(self, node):
+        statements = []
+        remaining = list(node.children.values())
+        for (i, statement) in enumerate(remaining):
+            statement = self.optimizeStatement(statement)
+            if statement is None:
+                continue
+            statements.append(statement)
+            if statement.node_type in (NodeType.ReturnStatement, NodeType.BreakStatement, NodeType.ContinueStatement):
+                self.report["statements_removed"] += len(remaining) - i - 1
+                break
+
+        node.children = {f"Statement{i+1}": statement for (i, statement) in enumerate(statements)}
+        return node
+
+    @trace
+    def optimizeStatement(self, node):
+        match node.node_type:
+            case NodeType.ExpressionStatement:
+                expression = self.optimizeChild(node, "Expression")
+                if constantValue(expression) is not None:
+                    self.report["statements_removed"] += 1
+                    return None
+            case NodeType.Declaration:
+                self.optimizeDeclaration(node)
+            case NodeType.CompoundStatement:
+                self.optimizeBlock(node)
+            case NodeType.ConditionalStatement if node.is_loop:
+                return self.optimizeLoop(node)
+            case NodeType.ConditionalStatement:
+                return self.optimizeConditional(node)
+            case NodeType.ReturnStatement if "Ret" in node.children:
+                self.optimizeChild(node, "Ret")
+            case NodeType.Function if "Body" in node.children:
+                self.optimizeBlock(node.children["Body"])
+        return node
+
+    def optimizeDeclaration(self, node):
+        for declarator in node.children.values():
+            if declarator.node_type != NodeType.Assignment:
+                continue
+            value = self.optimizeChild(declarator, "RValue")
+            identifier = declarator.children["LValue"]
+            constant = constantValue(value)
+            if (constant is not None and identifier.node_type == NodeType.Identifier
+                    and isArithmeticType(identifier.ctype) and declarator not in self.modified):
+                self.constants[declarator] = constant
+
+    def optimizeConditional(self, node):
+        condition = constantValue(self.optimizeChild(node, "If"))
+        if condition is None:
+            self.optimizeStatement(node.children["Then"])
+            if "Else" in node.children:
+                self.optimizeStatement(node.children["Else"])
+            return node
+
+        self.report["branches_removed"] += 1
+        taken = node.children["Then"] if condition else node.children.get("Else")
+        return self.optimizeStatement(taken) if taken is not None else None
+
+    def optimizeLoop(self, node):
+        if "Init" in node.children:
+            self.optimizeStatement(node.children["Init"])
+        if "If" in node.children:
+            condition = constantValue(self.optimizeChild(node, "If"))
+            if condition == 0 and "Init" not in node.children:
+                self.report["branches_removed"] += 1
+                return None
+            if condition:
+                # An always true condition is the same as no condition
+                del node.children["If"]
+                self.report["folded"] += 1
+        if "Step" in node.children:
+            self.optimizeChild(node, "Step")
+        self.optimizeStatement(node.children["Then"])
+        return node
+
+
+    # Expressions
+
+    def optimizeChild(self, node, key):
+        node.children[key] = self.optimizeExpression(node.children[key])
+        return node.children[key]
+
+    def optimizeChildren(self, node):
+        for key in node.children:
+            self.optimizeChild(node, key)
+
+    # Variables written by an expression stay variables, only their
+    #   subexpressions are optimized
+    def optimizeLValue(self, node, key):
+        lvalue = node.children[key]
+        match lvalue.node_type:
+            case NodeType.Identifier:
+                return
+            case NodeType.Parenthetical:
+                self.optimizeLValue(lvalue, "Group")
+            case _:
+                self.optimizeChildren(lvalue)
+
+    @trace
+    def optimizeExpression(self, node):
+        match node.node_type:
+            case NodeType.Identifier:
+                constant = self.constants.get(node.declaration)
+                if constant is not None:
+                    self.report["propagated"] += 1
+                    return makeLiteral(node, constant)
+                return node
+            case NodeType.Parenthetical:
+                group = self.optimizeChild(node, "Group")
+                return group if constantValue(group) is not None else node
+            case NodeType.Cast:
+                operand = constantValue(self.optimizeChild(node, "Operand"))
+                if operand is not None and isArithmeticType(node.ctype):
+                    return self.fold(node, castValue(node.ctype, operand))
+                return node
+            case NodeType.BinaryOperationExpression:
+                return self.optimizeBinary(node)
+            case NodeType.PrefixUnaryExpression if node.name in ("++", "--", "&"):
+                self.optimizeLValue(node, "Operand")
+                return node
+            case NodeType.PostfixUnaryExpression:
+                self.optimizeLValue(node, "Operand")
+                return node
+            case NodeType.PrefixUnaryExpression:
+                operand = constantValue(self.optimizeChild(node, "Operand"))
+                if operand is None:
+                    return node
+                match node.name:
+                    case "-":
+                        return self.fold(node, -operand)
+                    case "!":
+                        return self.fold(node, 0 if operand else 1)
+                return node
+            case NodeType.Assignment:
+                self.optimizeLValue(node, "LValue")
+                self.optimizeChild(node, "RValue")
+                return node
+            case NodeType.FunctionCall:
+                for key in node.children:
+                    if key != "Callee":
+                        self.optimizeChild(node, key)
+                return node
+            case _:
+                self.optimizeChildren(node)
+                return node
+
+    def optimizeBinary(self, node):
+        operation = node.name
+        left = constantValue(self.optimizeChild(node, "LeftOperand"))
+        right = constantValue(self.optimizeChild(node, "RightOperand"))
+
+        match operation:
+            case "&&" if left is not None:
+                if not left:
+                    return self.fold(node, 0)
+                if right is not None:
+                    return self.fold(node, 1 if right else 0)
+            case "||" if left is not None:
+                if left:
+                    return self.fold(node, 1)
+                if right is not None:
+                    return self.fold(node, 1 if right else 0)
+            case "&&" | "||":
+                pass
+            case _ if left is not None and right is not None:
+                if node.ctype is not None and not isArithmeticType(node.ctype):
+                    return node
+                try:
+                    return self.fold(node, applyBinaryOperation(operation, left, right))
+                except Error:
+                    # Division by zero and the like are reported when executed
+                    return node
+        return node
+
+    def fold(self, node, value):
+        self.report["folded"] += 1
+        return makeLiteral(node, value)
+
+
+    # Loop invariant code motion and common subexpression elimination
+    #   both work on expressions of tracked variables using only operators
+    #   that cannot fail. Such an expression is hoisted into a temporary
+    #   before a loop that never writes its variables, and an expression
+    #   repeated in a basic block with no write to its variables in between
+    #   is computed once into a temporary declared before its first use
+
+    @trace
+    def optimizeFunction(self, node):
+        body = node.children["Body"]
+        self.trackFunction(node)
+        self.markSideEffects(body)
+        self.hoistBlock(body)
+        self.markSideEffects(body)
+        self.reuseBlock(body)
+        self.tracked = set()
+
+    def trackFunction(self, node):
+        body = node.children["Body"]
+        self.tracked = {parameter for parameter in node.arguments if isScalarType(parameter.ctype)}
+        self.trackDeclarations(body)
+        self.untrackAddressed(body)
+
+    def trackDeclarations(self, node):
+        if node.node_type == NodeType.Declaration:
+            for declarator in node.children.values():
+                if isScalarType(declaratorIdentifier(declarator).ctype):
+                    self.tracked.add(declarator)
+        for child in node.children.values():
+            self.trackDeclarations(child)
+
+    def untrackAddressed(self, node):
+        if node.node_type == NodeType.PrefixUnaryExpression and node.name == "&":
+            self.tracked.discard(assignedDeclaration(node.children["Operand"]))
+        for child in node.children.values():
+            self.untrackAddressed(child)
+
+    # Marks the statements that assign, increment, call or declare, a
+    #   statement without side effects writes no variable
+    def markSideEffects(self, node):
+        effects = False
+        for child in node.children.values():
+            effects = self.markSideEffects(child) or effects
+        match node.node_type:
+            case NodeType.Assignment | NodeType.FunctionCall | NodeType.Declaration:
+                effects = True
+            case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if node.name in ("++", "--"):
+                effects = True
+        if isinstance(node, Statement):
+            node.side_effects = effects
+        return effects
+
+    # Variables a subtree assigns, increments or declares
+    def writtenDeclarations(self, node, written = None):
+        if written is None:
+            written = set()
+        if isinstance(node, Statement) and node.side_effects is False:
+            return written
+        match node.node_type:
+            case NodeType.Declaration:
+                written.update(node.children.values())
+            case NodeType.Assignment:
+                written.add(assignedDeclaration(node.children["LValue"]))
+            case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if node.name in ("++", "--"):
+                written.add(assignedDeclaration(node.children["Operand"]))
+        for child in node.children.values():
+            self.writtenDeclarations(child, written)
+        return written
+
+    # Variables an expression reads
+    def readDeclarations(self, node):
+        if node.node_type == NodeType.Identifier:
+            return {node.declaration}
+        declarations = set()
+        for child in node.children.values():
+            declarations |= self.readDeclarations(child)
+        return declarations
+
+    # Structural key of an expression that may be moved or shared, None when
+    #   it reads memory or untracked variables, has side effects or can fail
+    def expressionKey(self, node):
+        if not isScalarType(node.ctype):
+            return None
+        match node.node_type:
+            case NodeType.Identifier:
+                return ("var", id(node.declaration)) if node.declaration in self.tracked else None
+            case NodeType.IntLiteral | NodeType.FloatLiteral | NodeType.CharacterLiteral | NodeType.BooleanLiteral:
+                return ("const", node.ctype, constantValue(node))
+            case NodeType.Parenthetical:
+                return self.expressionKey(node.children["Group"])
+            case NodeType.Cast:
+                operand = self.expressionKey(node.children["Operand"])
+                return None if operand is None else ("cast", node.ctype, operand)
+            case NodeType.PrefixUnaryExpression if node.name == "-":
+                operand = self.expressionKey(node.children["Operand"])
+                return None if operand is None else ("neg", node.ctype, operand)
+            case NodeType.BinaryOperationExpression if node.name in TOTAL_OPERATORS or self.isSafeDivision(node):
+                left = self.expressionKey(node.children["LeftOperand"])
+                right = self.expressionKey(node.children["RightOperand"])
+                if left is None or right is None:
+                    return None
+                return (node.name, node.ctype, left, right)
+        return None
+
+    # Division by a nonzero constant cannot fail
+    def isSafeDivision(self, node):
+        if node.name not in ("/", "%"):
+            return False
+        divisor = constantValue(node.children["RightOperand"])
+        return divisor is not None and divisor != 0
+
+    # Collects the expressions under `parent.children[key]` that could be
+    #   moved as (parent, key, expression, expression key), those reading
+    #   none of the `written` variables. Only the outermost ones when
+    #   `outermost` is set. Plain variables and constants are cheaper to
+    #   read than a temporary and are left alone
+    def collectMovable(self, parent, key, written, found, outermost):
+        node = parent.children[key]
+        if node.node_type in (NodeType.BinaryOperationExpression, NodeType.Cast, NodeType.PrefixUnaryExpression):
+            expression_key = self.expressionKey(node)
+            if expression_key is not None and not self.readDeclarations(node) & written:
+                found.append((parent, key, node, expression_key))
+                if outermost:
+                    return found
+        for child_key in node.children:
+            if child_key != "Callee":
+                self.collectMovable(node, child_key, written, found, outermost)
+        return found
+
+    # Declares a temporary holding `expression`, of the expression's type
+    #   unless given, and replaces the occurrences with reads of it
+    def makeTemporary(self, expression, occurrences, type = None):
+        self.temporary_count += 1
+        name = f".t{self.temporary_count}"
+        type = type or expression.ctype
+        declarator = Assignment(self.makeTemporaryUse(name, type, expression, None), "=", expression)
+        declarator.ctype = type
+        declaration = Declaration(str(type), [declarator])
+        declaration.side_effects = True
+        declaration.start = expression.start
+        declaration.end = expression.end
+        declarator.children["LValue"].declaration = declarator
+        self.tracked.add(declarator)
+        
+        for (parent, key, _, _) in occurrences:
+            parent.children[key] = self.makeTemporaryUse(name, type, expression, declarator)
+        return declaration
+
+    def makeTemporaryUse(self, name, type, expression, declarator):
+        identifier = Identifier(name)
+        identifier.ctype = type
+        identifier.declaration = declarator
+        identifier.start = expression.start
+        identifier.end = expression.end
+        return identifier
+
+    def makeBlock(self, statements):
+        block = CompoundStatement(statements)
+        block.start = statements[0].start
+        block.end = statements[-1].end
+        return block
+
+    def setStatements(self, node, statements):
+        node.children = {f"Statement{i+1}": statement for (i, statement) in enumerate(statements)}
+
+    def hoistBlock(self, node):
+        statements = []
+        for statement in node.children.values():
+            statements += self.hoistStatement(statement)
+        self.setStatements(node, statements)
+
+    # A branch or loop body given hoisted temporaries becomes a block
+    def hoistChild(self, node, key):
+        statements = self.hoistStatement(node.children[key])
+        node.children[key] = statements[0] if len(statements) == 1 else self.makeBlock(statements)
+
+    # Moves invariants out of the loops in a statement, returns the
+    #   statement preceded by the temporaries hoisted out of it
+    def hoistStatement(self, node):
+        match node.node_type:
+            case NodeType.CompoundStatement:
+                self.hoistBlock(node)
+            case NodeType.ConditionalStatement if node.is_loop:
+                self.hoistChild(node, "Then")
+                return self.hoistLoop(node) + [node]
+            case NodeType.ConditionalStatement:
+                self.hoistChild(node, "Then")
+                if "Else" in node.children:
+                    self.hoistChild(node, "Else")
+        return [node]
+
+    # The `Init` of a `for` runs once and stays in place
+    def hoistLoop(self, node):
+        hoisted = self.hoistTemporaries(node)
+        
+        # The body may hold temporaries hoisted out of inner loops
+        self.markSideEffects(node)
+        written = self.writtenDeclarations(node)
+        candidates = []
+        for key in ("If", "Step", "Then"):
+            if key in node.children:
+                self.collectMovable(node, key, written, candidates, True)
+        
+        groups = {}
+        for candidate in candidates:
+            groups.setdefault(candidate[3], []).append(candidate)
+        
+        for occurrences in groups.values():
+            hoisted.append(self.makeTemporary(occurrences[0][2], occurrences))
+            self.report["hoisted"] += 1
+        return hoisted
+
+    # Temporaries hoisted out of an inner loop that are invariant in this
+    #   loop as well move out whole, their declaration is their only write
+    def hoistTemporaries(self, node):
+        body = node.children["Then"]
+        if body.node_type != NodeType.CompoundStatement:
+            return []
+        
+        self.markSideEffects(node)
+        written = self.writtenDeclarations(node)
+        hoisted = []
+        kept = []
+        for statement in body.children.values():
+            if self.isTemporary(statement) and not self.readDeclarations(statement.children["Decl1"].children["RValue"]) & written:
+                hoisted.append(statement)
+                written -= set(statement.children.values())
+            else:
+                kept.append(statement)
+        if hoisted:
+            self.setStatements(body, kept)
+        return hoisted
+
+    def isTemporary(self, node):
+        return node.node_type == NodeType.Declaration and node.children["Decl1"].children["LValue"].name.startswith(".")
+
+    def reuseBlock(self, node):
+        statements = list(node.children.values())
+        live = {}
+        groups = []
+        
+        def close(keys):
+            for key in keys:
+                (first, occurrences) = live.pop(key)
+                if len(occurrences) > 1:
+                    groups.append((first, occurrences))
+        
+        for (index, statement) in enumerate(statements):
+            if statement.node_type not in (NodeType.ExpressionStatement, NodeType.Declaration, NodeType.ReturnStatement):
+                # Control flow ends the basic block
+                close(list(live))
+                self.reuseStatement(statement)
+                continue
+            
+            written = self.writtenDeclarations(statement)
+            for occurrence in self.collectMovable(node, f"Statement{index+1}", written, [], False):
+                live.setdefault(occurrence[3], (index, []))[1].append(occurrence)
+            if written:
+                close([key for (key, (_, occurrences)) in live.items() if self.readDeclarations(occurrences[0][2]) & written])
+        close(list(live))
+        
+        # Larger expressions first, the smaller ones inside them are computed
+        #   once with them
+        groups.sort(key = lambda group: -len(group[1][0][2].get_children()))
+        replaced = set()
+        inserted = {}
+        for (first, occurrences) in groups:
+            remaining = [occurrence for occurrence in occurrences if id(occurrence[2]) not in replaced]
+            if len(remaining) < 2:
+                continue
+            for (_, _, expression, _) in remaining:
+                replaced.update(id(child) for child in [expression] + expression.get_children())
+            inserted.setdefault(first, []).append(self.makeTemporary(remaining[0][2], remaining))
+            self.report["reused"] += len(remaining) - 1
+        
+        if inserted:
+            result = []
+            for (index, statement) in enumerate(statements):
+                result += inserted.get(index, []) + [statement]
+            self.setStatements(node, result)
+
+    def reuseStatement(self, node):
+        match node.node_type:
+            case NodeType.CompoundStatement:
+                self.reuseBlock(node)
+            case NodeType.ConditionalStatement:
+                self.reuseChild(node, "Then")
+                if "Else" in node.children:
+                    self.reuseChild(node, "Else")
+
+    def reuseChild(self, node, key):
+        child = node.children[key]
+        if child.node_type == NodeType.CompoundStatement:
+            return self.reuseBlock(child)
+        block = self.makeBlock([child])
+        self.reuseBlock(block)
+        if len(block.children) > 1:
+            node.children[key] = block
+
+
+    # Call graph and inlining
+    #   a call to a small non-recursive function whose body returns a single
+    #   expression is replaced by that expression, its parameters renamed to
+    #   the arguments. Arguments that are constants or unchanging variables
+    #   are substituted directly, others are evaluated once into temporaries
+    #   before the statement making the call. Programs with a `main` then
+    #   lose the functions no longer reachable from it
+
+    @trace
+    def inlineModule(self, node):
+        self.collectFunctions(node)
+        self.buildCallGraph()
+        self.inlinable = {name for name in self.functions if self.isInlinable(name)}
+        
+        for name in self.callOrder():
+            function = self.functions[name]
+            self.trackFunction(function)
+            self.markSideEffects(function.children["Body"])
+            self.local_names = {declaratorIdentifier(parameter.children["Decl1"]).name for parameter in function.arguments}
+            self.collectLocalNames(function.children["Body"])
+            self.inlineBlock(function.children["Body"])
+        
+        self.buildCallGraph()
+        self.removeUnreachable(node)
+
+    def collectFunctions(self, node):
+        self.functions = {statement.name: statement for statement in node.children.values()
+                          if statement.node_type == NodeType.Function and "Body" in statement.children}
+
+    def buildCallGraph(self):
+        self.call_graph = {name: self.calledNames(function, set()) for (name, function) in self.functions.items()}
+
+    def calledNames(self, node, names):
+        if node.node_type == NodeType.FunctionCall:
+            names.add(node.children["Callee"].name)
+        for child in node.children.values():
+            self.calledNames(child, names)
+        return names
+
+    def reachableFrom(self, roots):
+        reachable = set()
+        pending = list(roots)
+        while pending:
+            name = pending.pop()
+            if name in reachable:
+                continue
+            reachable.add(name)
+            pending += self.call_graph.get(name, ())
+        return reachable
+
+    # Callees before their callers, so inlined bodies are already optimized
+    def callOrder(self):
+        order = []
+        visited = set()
+        def visit(name):
+            if name in visited or name not in self.functions:
+                return
+            visited.add(name)
+            for callee in sorted(self.call_graph[name]):
+                visit(callee)
+            order.append(name)
+        for name in self.functions:
+            visit(name)
+        return order
+
+    def isInlinable(self, name):
+        function = self.functions[name]
+        statements = list(function.children["Body"].children.values())
+        if len(statements) != 1 or statements[0].node_type != NodeType.ReturnStatement or "Ret" not in statements[0].children:
+            return False
+        if not isScalarType(function.ctype.return_type) or not all(isScalarType(parameter.ctype) for parameter in function.arguments):
+            return False
+        
+        returned = statements[0].children["Ret"]
+        if len(returned.get_children()) + 1 > INLINE_SIZE_LIMIT or name in self.reachableFrom(self.call_graph[name]):
+            return False
+        
+        # Parameters are only read, a substituted argument is never written
+        for child in [returned] + returned.get_children():
+            match child.node_type:
+                case NodeType.Assignment:
+                    return False
+                case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression if child.name in ("++", "--", "&"):
+                    return False
+        return True
+
+    def collectLocalNames(self, node):
+        if node.node_type == NodeType.Declaration:
+            for declarator in node.children.values():
+                self.local_names.add(declaratorIdentifier(declarator).name)
+        for child in node.children.values():
+            self.collectLocalNames(child)
+
+    def inlineBlock(self, node):
+        statements = []
+        for statement in node.children.values():
+            statements += self.inlineStatement(statement)
+        self.setStatements(node, statements)
+
+    # Inlines the calls in a statement, returns the statement preceded by
+    #   the temporaries holding arguments
+    def inlineStatement(self, node):
+        temporaries = []
+        match node.node_type:
+            case NodeType.ExpressionStatement | NodeType.Declaration | NodeType.ReturnStatement:
+                written = self.writtenDeclarations(node)
+                for key in node.children:
+                    self.inlineCalls(node, key, written, temporaries)
+            case NodeType.CompoundStatement:
+                self.inlineBlock(node)
+            case NodeType.ConditionalStatement if node.is_loop:
+                # Loop heads run repeatedly, only calls needing no temporary
+                for key in ("Init", "If", "Step"):
+                    if key in node.children:
+                        self.inlineCalls(node, key, self.writtenDeclarations(node.children[key]), None)
+                self.inlineChild(node, "Then")
+            case NodeType.ConditionalStatement:
+                self.inlineCalls(node, "If", self.writtenDeclarations(node.children["If"]), temporaries)
+                self.inlineChild(node, "Then")
+                if "Else" in node.children:
+                    self.inlineChild(node, "Else")
+        return temporaries + [node]
+
+    def inlineChild(self, node, key):
+        statements = self.inlineStatement(node.children[key])
+        node.children[key] = statements[0] if len(statements) == 1 else self.makeBlock(statements)
+
+    # Inlines the calls under `parent.children[key]`, arguments first.
+    #   Temporaries go to `temporaries`, None where an argument can not be
+    #   evaluated ahead of the expression
+    def inlineCalls(self, parent, key, written, temporaries):
+        node = parent.children[key]
+        for child_key in node.children:
+            if child_key == "Callee":
+                continue
+            conditional = node.node_type == NodeType.BinaryOperationExpression and node.name in ("&&", "||") and child_key == "RightOperand"
+            self.inlineCalls(node, child_key, written, None if conditional else temporaries)
+        
+        if node.node_type == NodeType.FunctionCall:
+            expression = self.inlineCall(node, written, temporaries)
+            if expression is not None:
+                parent.children[key] = expression
+                self.report["inlined"] += 1
+
+    def inlineCall(self, node, written, temporaries):
+        name = node.children["Callee"].name
+        if name not in self.inlinable or name in self.local_names:
+            return None
+        function = self.functions[name]
+        arguments = [child for (key, child) in node.children.items() if key != "Callee"]
+        if len(arguments) != len(function.arguments):
+            return None
+        
+        returned = function.children["Body"].children["Statement1"].children["Ret"]
+        # Names the body refers to must mean the same at the call site
+        if any(child.node_type == NodeType.Identifier and child.declaration not in function.arguments and child.name in self.local_names
+               for child in returned.get_children() + [returned]):
+            return None
+        
+        direct = [self.isDirectArgument(argument, parameter, written) for (argument, parameter) in zip(arguments, function.arguments)]
+        if not all(direct) and temporaries is None:
+            return None
+        
+        substitutions = {}
+        for (argument, parameter, is_direct) in zip(arguments, function.arguments, direct):
+            if is_direct:
+                substitutions[parameter] = argument
+            else:
+                declaration = self.makeTemporary(argument, [], parameter.ctype)
+                temporaries.append(declaration)
+                declarator = declaration.children["Decl1"]
+                substitutions[parameter] = declarator.children["LValue"]
+        
+        inlined = Parenthetical(cloneExpression(returned, substitutions))
+        inlined.ctype = node.ctype
+        inlined.start = node.start
+        inlined.end = node.end
+        return inlined
+
+    # Constants and variables the statement does not write can stand for
+    #   the parameter wherever it is read
+    def isDirectArgument(self, argument, parameter, written):
+        if argument.ctype != parameter.ctype:
+            return False
+        if constantValue(argument) is not None:
+            return True
+        return argument.node_type == NodeType.Identifier and argument.declaration in self.tracked and argument.declaration not in written
+
+    # With a `main` only the functions it or a global initializer calls can
+    #   run, the others are dropped
+    def removeUnreachable(self, node):
+        if "main" not in self.functions:
+            return
+        roots = {"main"}
+        for statement in node.children.values():
+            if statement.node_type != NodeType.Function:
+                self.calledNames(statement, roots)
+        reachable = self.reachableFrom(roots)
+        
+        statements = []
+        for statement in node.children.values():
+            if statement.node_type == NodeType.Function and statement.name not in reachable:
+                if self.functions.pop(statement.name, None) is not None:
+                    self.report["functions_removed"] += 1
+                continue
+            statements.append(statement)
+        self.setStatements(node, statements)
+
+
+    # Pure functions
+    #   a function is pure when its result depends on its arguments alone and
+    #   calling it has no other effect: its parameters and result are scalars,
+    #   the only globals it uses are arithmetic ones never modified after
+    #   their initialization, and it calls nothing but pure functions. Local
+    #   arrays and pointers to them are fine, nothing outside the frame can
+    #   reach them. Sets `Function.pure` and returns the names of the pure ones
+
+    @trace
+    def markPureFunctions(self, node):
+        self.findModified(node)
+        self.collectFunctions(node)
+        self.buildCallGraph()
+        self.global_declarators = {declarator for statement in node.children.values()
+                                   if statement.node_type == NodeType.Declaration
+                                   for declarator in statement.children.values()}
+
+        pure = {name for (name, function) in self.functions.items() if self.isPureCandidate(function)}
+        # Calls to impure functions, builtins included, spread to the callers
+        changed = True
+        while changed:
+            impure = {name for name in pure if not self.call_graph[name] <= pure}
+            pure -= impure
+            changed = bool(impure)
+
+        for (name, function) in self.functions.items():
+            function.pure = name in pure
+        return pure
+
+    def isPureCandidate(self, function):
+        if not isArithmeticType(function.ctype.return_type):
+            return False
+        if not all(isArithmeticType(parameter.ctype) for parameter in function.arguments):
+            return False
+        return all(self.isPureNode(child) for child in function.children["Body"].get_children())
+
+    def isPureNode(self, node):
+        match node.node_type:
+            case NodeType.StringLiteral:
+                return False
+            case NodeType.Identifier if node.declaration in self.global_declarators:
+                return isArithmeticType(node.ctype) and node.declaration not in self.modified
+        return True
@@ -1,30 +1,52 @@
+import functools
+
+from types import MethodType
+
 from c_lexer import *
 from c_ast import *
 from c_types import *
 
 
-def trace(function):
-    def wrapper(self, *args, **kwargs):
-        self.lex.skip_whitespace()
-        if not self.debug: 
-            return function(self, *args, **kwargs)
+# Debug tracing of parser, type checker and interpreter methods
+#   the first access on an instance binds either the plain method or the
+#   tracing one, depending on its debug flag, and caches it in the instance's
+#   __dict__. With debug off a traced method costs nothing over a plain one
+
+class trace:
+    
+    def __init__(self, function):
+        self.function = function
+        self.name = function.__name__
+        functools.update_wrapper(self, function)
+        
+    def __set_name__(self, owner, name):
+        self.name = name
+        
+    def __get__(self, instance, owner = None):
+        if instance is None:
+            return self
+        method = MethodType(self if instance.debug else self.function, instance)
+        instance.__dict__[self.name] = method
+        return method
+    
+    def __call__(self, instance, *args, **kwargs):
+        if not instance.debug: 
+            return self.function(instance, *args, **kwargs)
         
-        indent = " " * self.trace_depth
-        print(f"{indent}→ Entering {function.__name__}()")
-        self.trace_depth += 1
+        indent = " " * instance.trace_depth
+        print(f"{indent}→ Entering {self.name}()")
+        instance.trace_depth += 1
         result = None
         try:
-            result = function(self, *args, **kwargs)
+            result = self.function(instance, *args, **kwargs)
             return result
         except Error as e:
-            print(f"{indent}← (fail) Exiting {function.__name__}() with error: {e}")
+            print(f"{indent}← (fail) Exiting {self.name}() with error: {e}")
             raise
         finally:
-            self.trace_depth -= 1
+            instance.trace_depth -= 1
             if result is not None:
-                print(f"{indent}← (success) Exiting {function.__name__}() with result: {result}")
-            self.lex.skip_whitespace()
-    return wrapper
+                print(f"{indent}← (success) Exiting {self.name}() with result: {result}")
 
 
 def capture(parse_function):
@@ -67,6 +89,7 @@ class Parser:
                 self.lex.save_state()
                 call_stack.append(func.__name__)
                 parsed = func()
+                self.lex.discard_state()
                 return parsed
             except Error:
                 self.lex.resume_state()
@@ -205,13 +228,15 @@ class Parser:
     def parsePrimitive(self):
         self.lex.skip_whitespace()
         
-        match_with = self.lex.match_any(["true", "false", "'"])
+        match_with = self.lex.match_any(["true", "false", "'", "\""])
         
         match match_with:
             case "true" | "false":
                 return self.parseBooleanLiteral()
             case "'":
                 return self.parseCharacterLiteral()
+            case "\"":
+                return self.parseStringLiteral()
             case _:
                 return self.attempt([ 
                     self.parseNumericLiteral,
@@ -301,8 +326,8 @@ class Parser:
         expr = self.parseTerm()
         self.lex.skip_whitespace()
         
-        while self.lex.match_any([">", ">=", "<", "<="]) is not None:
-            comparison_operator = self.lex.expect_any([">", ">=", "<", "<="])
+        while self.lex.match_any([">=", "<=", ">", "<"]) is not None:
+            comparison_operator = self.lex.expect_any([">=", "<=", ">", "<"])
             self.lex.skip_whitespace()
             rhs = self.parseTerm()
         
@@ -419,9 +444,17 @@ class Parser:
     @trace
     def parseParameters(self):
         params_list = []
+        
+        if self.lex.match("void"):
+            self.lex.save_state()
+            self.lex.expect("void")
+            self.lex.skip_whitespace()
+            if self.lex.match(")"):
+                return params_list
+            self.lex.resume_state()
 
         while not self.lex.match(")"):
-            params_list.append(self.parseVariable())
+            params_list.append(self.parseParameter())
             
             if self.lex.match(")"):
                 break
@@ -432,11 +465,23 @@ class Parser:
 
         return params_list
 
+    @capture
+    @trace
+    def parseParameter(self):
+        type = self.parseType()
+        declarator = self.parseSymbol()
+        
+        return Declaration(type, [declarator])
+
     # Function declaration/definition
     @capture
     @trace
     def parseFunction(self):
-        return_type = self.lex.token()
+        return_type = self.parseType()
+        while self.lex.match("*"):
+            self.lex.expect("*")
+            self.lex.skip_whitespace()
+            return_type += "*"
         name = self.lex.token()
         self.lex.expect("(")
         self.lex.skip_whitespace()
@@ -450,6 +495,8 @@ class Parser:
         
         if is_definition:
             function_body = self.parseCompoundStatement()
+        else:
+            self.lex.expect(";")
 
         return Function(return_type, name, params, function_body)
         
@@ -459,20 +506,30 @@ class Parser:
         lvalue = self.parseSymbol()
         self.lex.skip_whitespace()
         
-        if self.lex.match_any(["=", "-=", "+=", "*=", "/=", "<<=", ">>=", "&=", "^=", "|="]) is not None:
-            assignment_operator = self.lex.expect_any(["=", "-=", "+=", "*=", "/=", "<<=", ">>=", "&=", "^=", "|="])
+        if self.lex.match_any(["=", "-=", "+=", "*=", "/=", "%=", "<<=", ">>=", "&=", "^=", "|="]) is not None:
+            assignment_operator = self.lex.expect_any(["=", "-=", "+=", "*=", "/=", "%=", "<<=", ">>=", "&=", "^=", "|="])
             self.lex.skip_whitespace()
-            rvalue = self.parseExpression()
+            if assignment_operator == "=" and self.lex.match("{"):
+                rvalue = self.parseArrayLiteral()
+            else:
+                rvalue = self.parseExpression()
             self.lex.skip_whitespace()
             return Assignment(lvalue, assignment_operator, rvalue)
         
         return lvalue
         
+    @trace
+    def parseStandaloneAssignment(self):
+        assignment = self.parseAssignment()
+        if assignment.node_type != NodeType.Assignment:
+            raise ParseError(self.lex, "Expected assignment")
+        return assignment
+        
     @capture
     @trace    
     def parseDeclaration(self):
         self.lex.skip_whitespace()
-        type = self.lex.token() # self.parseType()
+        type = self.parseType()
         declarations = []
         
         while not self.lex.match(";"):
@@ -525,17 +582,35 @@ class Parser:
         self.lex.expect("for")
         self.lex.skip_whitespace()
         self.lex.expect("(")
-        iterator = self.parseDeclaration()
-        self.lex.expect(";")
-        cond = self.parseExpression()
+        self.lex.skip_whitespace()
+        
+        init = None
+        if self.lex.match(";"):
+            self.lex.expect(";")
+        elif self.lex.match_keyword(TYPE_KEYWORDS + ["struct"]):
+            init = self.parseDeclaration()
+        else:
+            init = self.parseExpressionStatement()
+        
+        self.lex.skip_whitespace()
+        cond = None
+        if not self.lex.match(";"):
+            cond = self.parseExpression()
         self.lex.expect(";")
-        step = self.parseExpressionStatement()
+        
+        self.lex.skip_whitespace()
+        step = None
+        if not self.lex.match(")"):
+            step = self.attempt([
+                self.parseStandaloneAssignment,
+                self.parseExpression
+            ])
         self.lex.expect(")")
         self.lex.skip_whitespace()
         
-        body = self.parseCompoundStatement()
+        body = self.parseLoopBody()
         
-        return Conditional(cond, body, True)
+        return Conditional(cond, body, None, True, init, step)
 
     @capture
     @trace
@@ -547,16 +622,33 @@ class Parser:
         self.lex.expect(")")
         self.lex.skip_whitespace()
 
-        body = self.parseCompoundStatement()
+        body = self.parseLoopBody()
         
-        return Conditional(cond, body, True)
+        return Conditional(cond, body, None, True)
+    
+    def parseLoopBody(self):
+        if self.lex.match("{"):
+            return self.parseCompoundStatement()
+        return self.parseStatement()
+    
+    @capture
+    @trace
+    def parseJump(self):
+        keyword = self.lex.match_keyword(["break", "continue"])
+        self.lex.expect(keyword)
+        self.lex.skip_whitespace()
+        self.lex.expect(";")
+        
+        return Break() if keyword == "break" else Continue()
 
     @capture
     @trace
     def parseReturn(self):
         self.lex.expect("return")
         self.lex.skip_whitespace()
-        return_value = self.parseExpression()
+        return_value = None
+        if not self.lex.match(";"):
+            return_value = self.parseExpression()
         self.lex.skip_whitespace()
         self.lex.expect(";")
         
@@ -569,7 +661,8 @@ class Parser:
         
         self.lex.skip_whitespace()
         standalone_expression = self.attempt([
-            self.parseAssignment
+            self.parseStandaloneAssignment,
+            self.parseExpression
         ])
         self.lex.skip_whitespace()
         self.lex.expect(";")
@@ -581,7 +674,7 @@ class Parser:
     @trace
     def parseStatement(self):
         self.lex.skip_whitespace()
-        deterministic_parse = self.lex.match_any(["if", "for", "while", "return", "{"])
+        deterministic_parse = self.lex.match_keyword(STATEMENT_KEYWORDS) or self.lex.match_any(["{"])
                    
         match deterministic_parse:
             case "if":
@@ -592,11 +685,25 @@ class Parser:
                 return self.parseWhile()
             case "return":
                 return self.parseReturn()
+            case "break" | "continue":
+                return self.parseJump()
             case "{":
                 return self.parseCompoundStatement()
+            case "struct":
+                return self.attempt([
+                    self.parseStruct,
+                    self.parseFunction,
+                    self.parseDeclaration
+                ])
+            case None if self.lex.match_keyword(TYPE_KEYWORDS):
+                return self.attempt([
+                    self.parseFunction,
+                    self.parseDeclaration
+                ])
             case None:
                 return self.attempt([
                     self.parseExpressionStatement,
+                    self.parseFunction,
                     self.parseDeclaration
                 ])
         
@@ -628,8 +735,24 @@ class Parser:
         pass
 
 
+    @capture
+    @trace
     def parseStruct(self):
-       pass
+        self.lex.expect("struct")
+        struct_name = self.lex.token()
+        self.lex.expect("{")
+        self.lex.skip_whitespace()
+        
+        attributes = []
+        while not self.lex.match("}"):
+            attributes.append(self.parseDeclaration())
+            self.lex.skip_whitespace()
+            
+        self.lex.expect("}")
+        self.lex.skip_whitespace()
+        self.lex.expect(";")
+        
+        return Struct(struct_name, attributes)
    
    
     @capture
@@ -638,10 +761,24 @@ class Parser:
         self.lex.expect("{")
         self.lex.skip_whitespace()
         
-        self.lex.eat_until("}")
-        pass
+        elements = []
+        while not self.lex.match("}"):
+            if self.lex.match("{"):
+                elements.append(self.parseArrayLiteral())
+            else:
+                elements.append(self.parseExpression())
+            self.lex.skip_whitespace()
+            
+            if self.lex.match("}"):
+                break
+            
+            self.lex.expect(",")
+            self.lex.skip_whitespace()
+            
+        self.lex.expect("}")
+        
+        return ArrayLiteral(None, elements)
         
-    @capture
     @trace
     def parseType(self):
         type = self.lex.token()
@@ -649,14 +786,13 @@ class Parser:
         # Struct
         if type == "struct":
             struct_name = self.lex.token()
+            type = f"{type} {struct_name}"
         
-        option = self.lex.expect_any(["[]", "*", ""])
-        
-        
-        
+        # Pointer and array suffixes belong to the declarator, see
+        #   TypeChecker.resolveDeclarator
         self.lex.skip_whitespace()
         
-        return None
+        return type
     
     
     @capture
@@ -0,0 +1,540 @@
+from c_ast import *
+from c_types import *
+from c_env import *
+from c_error import *
+from c_parse import trace
+
+
+# Static type checking
+#   resolves the C type of every expression into `Node.ctype`, wraps operands
+#   that need an implicit conversion in a Cast node, and rejects ill-typed
+#   programs before they are executed
+
+class TypeChecker:
+
+    def __init__(self, lex, debug = False):
+        self.lex = lex
+        self.debug = debug
+        self.trace_depth = 0
+
+        self.current_env = Environment(None, "Global")
+        self.struct_map = {}
+        self.current_function = None
+        self.loop_depth = 0
+
+        for (name, type) in BUILTIN_FUNCTION_TYPES.items():
+            self.current_env.insert_mapping(name, type, None)
+
+    def error(self, node, msg):
+        raise TypeError(self.lex, f"{msg} @ {node.format_file_pos()}")
+
+    def newEnvironment(self, name = ""):
+        self.current_env = Environment(self.current_env, name)
+
+    def popEnvironment(self):
+        self.current_env = self.current_env.parent_env
+
+    def declareSymbol(self, node, name, type):
+        (_, _, depth) = self.current_env.get_mapping(name)
+        if depth == self.current_env.depth:
+            self.error(node, f"Illegal redeclaration of '{name}' in same scope")
+        self.current_env.insert_mapping(name, type, node)
+
+
+    # Types
+
+    def resolveType(self, node, type_string):
+        pointer_depth = len(type_string) - len(type_string.rstrip("*"))
+        base_name = type_string.rstrip("*").strip()
+
+        if base_name.startswith("struct "):
+            struct_name = base_name[len("struct "):].strip()
+            if struct_name not in self.struct_map:
+                self.error(node, f"Unknown type 'struct {struct_name}'")
+            type = self.struct_map[struct_name]
+        else:
+            type = getTypeFromString(base_name)
+            if not type:
+                self.error(node, f"Unknown type '{base_name}'")
+
+        for _ in range(pointer_depth):
+            type = PointerType(type)
+        return type
+
+    # Applies the pointer and array suffixes of a declarator to its base type,
+    #   `*a[3]` declares an array of 3 pointers and `a[2][3]` an array of 2 arrays of 3
+    def resolveDeclarator(self, declarator, type):
+        match declarator.node_type:
+            case NodeType.Identifier:
+                declarator.ctype = type
+                return (declarator.name, type)
+            case NodeType.Assignment:
+                return self.resolveDeclarator(declarator.children["LValue"], type)
+            case NodeType.PrefixUnaryExpression if declarator.name == "*":
+                return self.resolveDeclarator(declarator.children["Operand"], PointerType(type))
+            case NodeType.Subscript:
+                index = declarator.children["Index"]
+                if index.node_type != NodeType.IntLiteral or index.value <= 0:
+                    self.error(declarator, "Array length must be a positive integer constant")
+                return self.resolveDeclarator(declarator.children["Locator"], ArrayType(type, index.value))
+            case NodeType.Parenthetical:
+                return self.resolveDeclarator(declarator.children["Group"], type)
+        self.error(declarator, "Invalid declarator")
+
+    def isAssignable(self, target_type, source_type, source):
+        if isArithmeticType(target_type) and isArithmeticType(source_type):
+            return True
+        if isPointerType(target_type):
+            if isPointerType(source_type):
+                return (target_type == source_type
+                        or target_type.target == PrimitiveType.VOID
+                        or source_type.target == PrimitiveType.VOID)
+            return source.node_type == NodeType.IntLiteral and source.value == 0
+        if isinstance(target_type, StructType):
+            return target_type == source_type
+        return False
+
+    # Checks that the child at `key` can be converted to `target_type` and wraps it
+    #   in a Cast when the runtime representation changes
+    def convertChild(self, parent, key, target_type, context):
+        child = parent.children[key]
+        source_type = decayType(child.ctype)
+
+        if not self.isAssignable(target_type, source_type, child):
+            self.error(child, f"Cannot convert '{child.ctype}' to '{target_type}' in {context}")
+
+        if source_type != target_type and isArithmeticType(source_type) and isArithmeticType(target_type):
+            parent.children[key] = Cast(child, target_type)
+
+    # Pointer arithmetic counts in elements, the offset operand is scaled to bytes
+    def scaleChild(self, parent, key, pointer_type):
+        size = sizeOf(pointer_type.target)
+        if size != 1:
+            child = parent.children[key]
+            scale = IntLiteral(size)
+            scale.ctype = PrimitiveType.INT
+            scaled = Binary(child, scale, "*")
+            scaled.ctype = PrimitiveType.INT
+            scaled.start, scaled.end = child.start, child.end
+            parent.children[key] = scaled
+
+    # The byte distance between two pointers is divided back into elements
+    def scalePointerDifference(self, node, pointer_type):
+        difference = Binary(node.children["LeftOperand"], node.children["RightOperand"], "-")
+        difference.ctype = PrimitiveType.INT
+        difference.start, difference.end = node.start, node.end
+        scale = IntLiteral(sizeOf(pointer_type.target))
+        scale.ctype = PrimitiveType.INT
+        
+        node.name = "/"
+        node.children = {}
+        node.add("LeftOperand", difference)
+        node.add("RightOperand", scale)
+
+    def usualArithmeticConversion(self, node, lhs_type, rhs_type):
+        if lhs_type == PrimitiveType.FLOAT or rhs_type == PrimitiveType.FLOAT:
+            self.convertChild(node, "LeftOperand", PrimitiveType.FLOAT, "arithmetic conversion")
+            self.convertChild(node, "RightOperand", PrimitiveType.FLOAT, "arithmetic conversion")
+            return PrimitiveType.FLOAT
+        return PrimitiveType.INT
+
+    def isLValue(self, node):
+        match node.node_type:
+            case NodeType.Identifier | NodeType.Subscript | NodeType.MemberSelection:
+                return True
+            case NodeType.PrefixUnaryExpression:
+                return node.name == "*"
+            case NodeType.Parenthetical:
+                return self.isLValue(node.children["Group"])
+        return False
+
+    def expectLValue(self, node, context):
+        if not self.isLValue(node):
+            self.error(node, f"Expression is not assignable in {context}")
+        if isinstance(node.ctype, ArrayType):
+            self.error(node, f"Array '{node.ctype}' is not assignable in {context}")
+
+    def expectScalar(self, node, type, context):
+        if not isScalarType(decayType(type)):
+            self.error(node, f"Expected scalar value in {context}, got '{type}'")
+
+
+    # Expressions
+
+    @trace
+    def checkExpression(self, node):
+        type = None
+
+        match node.node_type:
+            case NodeType.IntLiteral:
+                type = PrimitiveType.INT
+            case NodeType.FloatLiteral:
+                type = PrimitiveType.FLOAT
+            case NodeType.CharacterLiteral:
+                type = PrimitiveType.CHAR
+            case NodeType.BooleanLiteral:
+                type = PrimitiveType.BOOL
+            case NodeType.StringLiteral:
+                type = ArrayType(PrimitiveType.CHAR, len(node.value) + 1)
+            case NodeType.Identifier:
+                (declaration, type, depth) = self.current_env.get_mapping(node.name)
+                if depth is None:
+                    self.error(node, f"Use of undeclared identifier '{node.name}'")
+                node.declaration = declaration
+            case NodeType.Parenthetical:
+                type = self.checkExpression(node.children["Group"])
+            case NodeType.Cast:
+                self.checkExpression(node.children["Operand"])
+                type = node.ctype
+            case NodeType.BinaryOperationExpression:
+                type = self.checkBinary(node)
+            case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression:
+                type = self.checkUnary(node)
+            case NodeType.Assignment:
+                type = self.checkAssignment(node)
+            case NodeType.FunctionCall:
+                type = self.checkFunctionCall(node)
+            case NodeType.Subscript:
+                type = self.checkSubscript(node)
+            case NodeType.MemberSelection:
+                type = self.checkMemberSelection(node)
+            case _:
+                self.error(node, f"Unsupported expression type: {node.node_type}")
+
+        node.ctype = type
+        return type
+
+    @trace
+    def checkBinary(self, node):
+        operation = node.name
+        lhs_type = decayType(self.checkExpression(node.children["LeftOperand"]))
+        rhs_type = decayType(self.checkExpression(node.children["RightOperand"]))
+
+        match operation:
+            case "||" | "&&":
+                self.expectScalar(node.children["LeftOperand"], lhs_type, f"'{operation}'")
+                self.expectScalar(node.children["RightOperand"], rhs_type, f"'{operation}'")
+                return PrimitiveType.INT
+
+            case "+" | "-" | "*" | "/":
+                if isArithmeticType(lhs_type) and isArithmeticType(rhs_type):
+                    return self.usualArithmeticConversion(node, lhs_type, rhs_type)
+                if operation in ("+", "-") and isPointerType(lhs_type) and isIntegerType(rhs_type):
+                    self.scaleChild(node, "RightOperand", lhs_type)
+                    return lhs_type
+                if operation == "+" and isIntegerType(lhs_type) and isPointerType(rhs_type):
+                    self.scaleChild(node, "LeftOperand", rhs_type)
+                    return rhs_type
+                if operation == "-" and isPointerType(lhs_type) and lhs_type == rhs_type:
+                    self.scalePointerDifference(node, lhs_type)
+                    return PrimitiveType.INT
+
+            case "%":
+                if isIntegerType(lhs_type) and isIntegerType(rhs_type):
+                    return PrimitiveType.INT
+
+            case "<" | "<=" | ">" | ">=" | "==" | "!=":
+                if isArithmeticType(lhs_type) and isArithmeticType(rhs_type):
+                    self.usualArithmeticConversion(node, lhs_type, rhs_type)
+                    return PrimitiveType.INT
+                if isPointerType(lhs_type) and self.isAssignable(lhs_type, rhs_type, node.children["RightOperand"]):
+                    return PrimitiveType.INT
+                if isPointerType(rhs_type) and self.isAssignable(rhs_type, lhs_type, node.children["LeftOperand"]):
+                    return PrimitiveType.INT
+
+        self.error(node, f"Invalid operands to '{operation}' ('{lhs_type}' and '{rhs_type}')")
+
+    @trace
+    def checkUnary(self, node):
+        operator = node.name
+        operand = node.children["Operand"]
+        operand_type = self.checkExpression(operand)
+
+        match operator:
+            case "-":
+                if isArithmeticType(operand_type):
+                    return PrimitiveType.FLOAT if operand_type == PrimitiveType.FLOAT else PrimitiveType.INT
+            case "!":
+                self.expectScalar(operand, operand_type, "'!'")
+                return PrimitiveType.INT
+            case "&":
+                if self.isLValue(operand):
+                    return PointerType(operand_type)
+                self.error(node, "Cannot take the address of an rvalue")
+            case "*":
+                pointer_type = decayType(operand_type)
+                if isPointerType(pointer_type) and pointer_type.target != PrimitiveType.VOID:
+                    return pointer_type.target
+                self.error(node, f"Cannot dereference '{operand_type}'")
+            case "++" | "--":
+                self.expectLValue(operand, f"'{operator}'")
+                if isPointerType(operand_type):
+                    node.step = sizeOf(operand_type.target)
+                    return operand_type
+                if isArithmeticType(operand_type):
+                    return operand_type
+
+        self.error(node, f"Invalid operand to '{operator}' ('{operand_type}')")
+
+    @trace
+    def checkAssignment(self, node):
+        lvalue = node.children["LValue"]
+        lvalue_type = self.checkExpression(lvalue)
+        rvalue_type = decayType(self.checkExpression(node.children["RValue"]))
+        self.expectLValue(lvalue, "assignment")
+
+        operation = node.name[:-1]
+        match operation:
+            case "":
+                self.convertChild(node, "RValue", lvalue_type, "assignment")
+            case "+" | "-" if isPointerType(lvalue_type) and isIntegerType(rvalue_type):
+                self.scaleChild(node, "RValue", lvalue_type)
+            case "+" | "-" | "*" | "/" if isArithmeticType(lvalue_type) and isArithmeticType(rvalue_type):
+                if lvalue_type != PrimitiveType.FLOAT and rvalue_type == PrimitiveType.FLOAT:
+                    node.conversion = lvalue_type
+            case "%" | "<<" | ">>" | "&" | "^" | "|" if isIntegerType(lvalue_type) and isIntegerType(rvalue_type):
+                pass
+            case _:
+                self.error(node, f"Invalid operands to '{node.name}' ('{lvalue_type}' and '{rvalue_type}')")
+
+        return lvalue_type
+
+    @trace
+    def checkFunctionCall(self, node):
+        callee = node.children["Callee"]
+        function_type = self.checkExpression(callee)
+
+        if not isinstance(function_type, FunctionType):
+            self.error(node, f"Called object of type '{function_type}' is not a function")
+
+        parameter_types = function_type.parameter_types
+        argument_count = len(node.children) - 1
+
+        if argument_count < len(parameter_types) or (argument_count > len(parameter_types) and not function_type.variadic):
+            self.error(node, f"'{callee.name}' expects {len(parameter_types)} argument(s), got {argument_count}")
+
+        for i in range(argument_count):
+            argument_type = self.checkExpression(node.children[f"Arg{i+1}"])
+            if i < len(parameter_types):
+                self.convertChild(node, f"Arg{i+1}", parameter_types[i], f"argument {i+1} of '{callee.name}'")
+            elif argument_type == PrimitiveType.VOID:
+                self.error(node, f"Void value passed as argument {i+1} of '{callee.name}'")
+
+        return function_type.return_type
+
+    @trace
+    def checkSubscript(self, node):
+        locator_type = decayType(self.checkExpression(node.children["Locator"]))
+        index_type = self.checkExpression(node.children["Index"])
+
+        if not isPointerType(locator_type) or locator_type.target == PrimitiveType.VOID:
+            self.error(node, f"Subscripted value of type '{locator_type}' is not an array or pointer")
+        if not isIntegerType(index_type):
+            self.error(node, f"Array subscript of type '{index_type}' is not an integer")
+
+        return locator_type.target
+
+    @trace
+    def checkMemberSelection(self, node):
+        object_type = self.checkExpression(node.children["Object"])
+        member = node.children["Member"]
+
+        if node.access_type == "->":
+            if not isPointerType(object_type):
+                self.error(node, f"Member reference type '{object_type}' is not a pointer")
+            object_type = object_type.target
+
+        if not isinstance(object_type, StructType):
+            self.error(node, f"Member reference base type '{object_type}' is not a structure")
+        if member.name not in object_type.fields:
+            self.error(node, f"No member named '{member.name}' in '{object_type}'")
+
+        member.ctype = object_type.fields[member.name]
+        return member.ctype
+
+
+    # Statements
+
+    @trace
+    def checkStatement(self, node):
+        match node.node_type:
+            case NodeType.ExpressionStatement:
+                self.checkExpression(node.children["Expression"])
+            case NodeType.Declaration:
+                self.checkDeclaration(node)
+            case NodeType.CompoundStatement:
+                self.newEnvironment()
+                self.checkStatements(node)
+                self.popEnvironment()
+            case NodeType.ConditionalStatement:
+                self.checkConditional(node)
+            case NodeType.ReturnStatement:
+                self.checkReturn(node)
+            case NodeType.BreakStatement | NodeType.ContinueStatement:
+                if self.loop_depth == 0:
+                    keyword = "break" if node.node_type == NodeType.BreakStatement else "continue"
+                    self.error(node, f"'{keyword}' statement not in loop")
+            case NodeType.Function:
+                self.checkFunction(node)
+            case NodeType.Struct:
+                self.checkStruct(node)
+            case _:
+                self.error(node, f"Unsupported statement type: {node.node_type}")
+
+    def checkStatements(self, node):
+        for i in range(len(node.children)):
+            self.checkStatement(node.children[f"Statement{i+1}"])
+
+    @trace
+    def checkDeclaration(self, node):
+        base_type = self.resolveType(node, node.type)
+
+        for i in range(len(node.children)):
+            declarator = node.children[f"Decl{i+1}"]
+            (name, type) = self.resolveDeclarator(declarator, base_type)
+
+            if type == PrimitiveType.VOID:
+                self.error(declarator, f"Variable '{name}' declared void")
+
+            self.declareSymbol(declarator, name, type)
+
+            if declarator.node_type == NodeType.Assignment:
+                if declarator.name != "=":
+                    self.error(declarator, "Expected '=' in initializer")
+                self.checkInitializer(declarator, "RValue", type, name)
+                declarator.ctype = type
+                
+    # Brace initializers fill arrays element by element and structs field by field,
+    #   string literals may initialize char arrays
+    def checkInitializer(self, parent, key, type, name):
+        initializer = parent.children[key]
+        
+        if initializer.node_type == NodeType.ArrayLiteral:
+            if isinstance(type, ArrayType):
+                element_types = [type.element] * type.length
+            elif isinstance(type, StructType):
+                element_types = list(type.fields.values())
+            else:
+                self.error(initializer, f"Brace initializer for scalar '{name}' of type '{type}'")
+            
+            if len(initializer.children) > len(element_types):
+                self.error(initializer, f"Excess elements in initializer of '{name}'")
+            for i in range(len(initializer.children)):
+                self.checkInitializer(initializer, f"Element{i+1}", element_types[i], name)
+            initializer.ctype = type
+            return
+        
+        if initializer.node_type == NodeType.StringLiteral and isinstance(type, ArrayType) and type.element == PrimitiveType.CHAR:
+            if len(initializer.value) > type.length:
+                self.error(initializer, f"Initializer string for '{name}' is too long")
+            initializer.ctype = type
+            return
+        
+        if isinstance(type, ArrayType):
+            self.error(initializer, f"Array '{name}' must be initialized with a brace initializer")
+        self.checkExpression(initializer)
+        self.convertChild(parent, key, type, f"initialization of '{name}'")
+
+    @trace
+    def checkConditional(self, node):
+        if node.is_loop:
+            return self.checkLoop(node)
+
+        condition = node.children["If"]
+        self.expectScalar(condition, self.checkExpression(condition), "condition")
+
+        self.checkStatement(node.children["Then"])
+        if "Else" in node.children:
+            self.checkStatement(node.children["Else"])
+
+    # Declarations in the head of a `for` are scoped to the loop
+    def checkLoop(self, node):
+        self.newEnvironment()
+        if "Init" in node.children:
+            self.checkStatement(node.children["Init"])
+        if "If" in node.children:
+            condition = node.children["If"]
+            self.expectScalar(condition, self.checkExpression(condition), "condition")
+        if "Step" in node.children:
+            self.checkExpression(node.children["Step"])
+
+        self.loop_depth += 1
+        self.checkStatement(node.children["Then"])
+        self.loop_depth -= 1
+        self.popEnvironment()
+
+    @trace
+    def checkReturn(self, node):
+        if self.current_function is None:
+            self.error(node, "Return statement outside of a function")
+
+        return_type = self.current_function.ctype.return_type
+
+        if "Ret" not in node.children:
+            if return_type != PrimitiveType.VOID:
+                self.error(node, f"Non-void function '{self.current_function.name}' should return a value")
+            return
+
+        if return_type == PrimitiveType.VOID:
+            self.error(node, f"Void function '{self.current_function.name}' should not return a value")
+        self.checkExpression(node.children["Ret"])
+        self.convertChild(node, "Ret", return_type, "return")
+        node.ctype = return_type
+
+    @trace
+    def checkFunction(self, node):
+        if self.current_env.depth != 0:
+            self.error(node, "Function declarations only allowed at top-level")
+
+        return_type = self.resolveType(node, node.type)
+
+        parameters = []
+        for parameter in node.arguments:
+            (name, type) = self.resolveDeclarator(parameter.children["Decl1"], self.resolveType(parameter, parameter.type))
+            parameter.ctype = decayType(type)
+            parameters.append((name, parameter.ctype, parameter))
+
+        node.ctype = FunctionType(return_type, [type for (_, type, _) in parameters])
+
+        (_, previous_type, depth) = self.current_env.get_mapping(node.name)
+        if depth is None:
+            self.current_env.insert_mapping(node.name, node.ctype, node)
+        elif previous_type != node.ctype:
+            self.error(node, f"Conflicting types for '{node.name}'")
+
+        if "Body" not in node.children:
+            return
+
+        self.current_function = node
+        self.newEnvironment(node.name)
+        for (name, type, parameter) in parameters:
+            self.declareSymbol(parameter, name, type)
+        self.checkStatements(node.children["Body"])
+        self.popEnvironment()
+        self.current_function = None
+
+    @trace
+    def checkStruct(self, node):
+        if node.name in self.struct_map:
+            self.error(node, f"Redefinition of 'struct {node.name}'")
+
+        struct_type = StructType(node.name)
+        self.struct_map[node.name] = struct_type
+
+        for attribute in node.attributes:
+            base_type = self.resolveType(attribute, attribute.type)
+            for i in range(len(attribute.children)):
+                (name, type) = self.resolveDeclarator(attribute.children[f"Decl{i+1}"], base_type)
+                if name in struct_type.fields:
+                    self.error(attribute, f"Duplicate member '{name}'")
+                if type == struct_type or type == PrimitiveType.VOID:
+                    self.error(attribute, f"Field '{name}' has incomplete type '{type}'")
+                struct_type.fields[name] = type
+
+        node.ctype = struct_type
+
+    @trace
+    def checkModule(self, node):
+        if node.node_type == NodeType.TranslationUnit:
+            self.checkStatements(node)
+        return node
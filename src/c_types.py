@@ -1,9 +1,13 @@
 
+import math
+import operator
 
 from enum import Enum
 
+from c_error import RuntimeError, ValueError
+
 TYPE_KEYWORDS = ["int", "float", "char", "void", "bool"]
-STATEMENT_KEYWORDS = ["return", "struct", "if", "while", "for"]
+STATEMENT_KEYWORDS = ["return", "struct", "if", "while", "for", "break", "continue"]
 
 
 class PrimitiveType(Enum):
@@ -13,16 +17,76 @@ class PrimitiveType(Enum):
     CHAR = 4
     VOID = 5
     
+    def __str__(self):
+        return self.name.lower()
+    
 class PointerType():
-    INT_POINTER = 1
-    FLOAT_POINTER = 2
-    BOOL_POINTER = 3
-    CHAR_POINTER = 4
-    VOID_POINTER = 5
+    def __init__(self, target):
+        self.target = target
+        
+    def __eq__(self, other):
+        return isinstance(other, PointerType) and self.target == other.target
+    
+    def __hash__(self):
+        return hash(("pointer", self.target))
+    
+    def __str__(self):
+        return f"{self.target}*"
+    
+class ArrayType():
+    def __init__(self, element, length):
+        self.element = element
+        self.length = length
+        
+    def __eq__(self, other):
+        return isinstance(other, ArrayType) and self.element == other.element and self.length == other.length
+    
+    def __hash__(self):
+        return hash(("array", self.element, self.length))
+    
+    def __str__(self):
+        return f"{self.element}[{self.length if self.length is not None else ''}]"
+    
+class FunctionType():
+    def __init__(self, return_type, parameter_types, variadic = False):
+        self.return_type = return_type
+        self.parameter_types = parameter_types
+        self.variadic = variadic
+        
+    def __eq__(self, other):
+        return (isinstance(other, FunctionType) and self.return_type == other.return_type 
+                and self.parameter_types == other.parameter_types and self.variadic == other.variadic)
+    
+    def __hash__(self):
+        return hash(("function", self.return_type, tuple(self.parameter_types), self.variadic))
+    
+    def __str__(self):
+        parameters = ", ".join(str(t) for t in self.parameter_types) + (", ..." if self.variadic else "")
+        return f"{self.return_type}({parameters})"
     
 class ObjectType():
     
     pass
+
+class StructType(ObjectType):
+    def __init__(self, name):
+        self.name = name
+        self.fields = {}
+        
+        # Layout, computed once the struct is complete, see layoutStruct
+        self.offsets = None
+        self.size = None
+        self.align = None
+        
+    # Structs are nominal, two struct types are equal only if they are the same declaration
+    def __eq__(self, other):
+        return self is other
+    
+    def __hash__(self):
+        return id(self)
+    
+    def __str__(self):
+        return f"struct {self.name}"
     
     
 # class ConditionalType(Enum):
@@ -46,10 +110,108 @@ def getTypeFromString(type):
             return PrimitiveType.VOID
     return 0
     
+def isIntegerType(type):
+    return type in (PrimitiveType.INT, PrimitiveType.CHAR, PrimitiveType.BOOL)
+
+def isArithmeticType(type):
+    return isIntegerType(type) or type == PrimitiveType.FLOAT
+
+def isPointerType(type):
+    return isinstance(type, PointerType)
+
+def isScalarType(type):
+    return isArithmeticType(type) or isPointerType(type)
+
+# Arrays used as values decay into a pointer to their first element
+def decayType(type):
+    if isinstance(type, ArrayType):
+        return PointerType(type.element)
+    return type
+
+# Memory layout
+#   scalars are stored with their natural size and alignment, the format
+#   characters select the typed `memoryview` used to access them
+
+PRIMITIVE_SIZES = {
+    PrimitiveType.INT: 4,
+    PrimitiveType.FLOAT: 4,
+    PrimitiveType.CHAR: 1,
+    PrimitiveType.BOOL: 1,
+    PrimitiveType.VOID: 1,
+}
+POINTER_SIZE = 8
+
+PRIMITIVE_FORMATS = {
+    PrimitiveType.INT: "i",
+    PrimitiveType.FLOAT: "f",
+    PrimitiveType.CHAR: "b",
+    PrimitiveType.BOOL: "B",
+}
+POINTER_FORMAT = "Q"
+
+def sizeOf(type):
+    if isinstance(type, PrimitiveType):
+        return PRIMITIVE_SIZES[type]
+    if isinstance(type, PointerType):
+        return POINTER_SIZE
+    if isinstance(type, ArrayType):
+        return type.length * sizeOf(type.element)
+    if isinstance(type, StructType):
+        return layoutStruct(type).size
+    raise ValueError(None, f"Type '{type}' has no size")
+
+def alignOf(type):
+    if isinstance(type, ArrayType):
+        return alignOf(type.element)
+    if isinstance(type, StructType):
+        return layoutStruct(type).align
+    return sizeOf(type)
+
+def layoutStruct(struct_type):
+    if struct_type.offsets is None:
+        offsets = {}
+        offset = 0
+        align = 1
+        for (name, type) in struct_type.fields.items():
+            field_align = alignOf(type)
+            offset = (offset + field_align - 1) & -field_align
+            offsets[name] = offset
+            offset += sizeOf(type)
+            align = max(align, field_align)
+            
+        struct_type.align = align
+        struct_type.size = (offset + align - 1) & -align
+        struct_type.offsets = offsets
+    return struct_type
+
+def scalarFormat(type):
+    if isinstance(type, PointerType):
+        return POINTER_FORMAT
+    return PRIMITIVE_FORMATS.get(type)
+
+# Arrays and structs are not loaded as values, they are referred to by address
+def isAggregateType(type):
+    return isinstance(type, (ArrayType, StructType))
+
+# Converts a runtime value to the representation of the given type
+def castValue(type, value):
+    match type:
+        case PrimitiveType.FLOAT:
+            return float(value)
+        case PrimitiveType.INT:
+            return int(value)
+        case PrimitiveType.CHAR:
+            return ((int(value) + 128) & 0xFF) - 128
+        case PrimitiveType.BOOL:
+            return 1 if value else 0
+    return value
+    
 def getNoneType(type):
     match type:
-        case PrimitiveType.INT | PrimitiveType.FLOAT | PrimitiveType.CHAR:
+        case PrimitiveType.INT | PrimitiveType.CHAR | PrimitiveType.BOOL:
             return 0
+        case PrimitiveType.FLOAT:
+            return 0.0
         case PrimitiveType.VOID:
             return 
         case "bool":
@@ -60,4 +222,91 @@ def getNoneType(type):
             return PrimitiveType.VOID
         case _:
             return 0
-    
\ No newline at end of file
+            
+        
+# C arithmetic semantics
+#   integer division truncates toward zero and the remainder takes the sign of
+#   the dividend, unlike Python's floor division
+
+def c_divide(lhs, rhs):
+    if rhs == 0:
+        raise RuntimeError(None, "Division by zero")
+    quotient = abs(lhs) // abs(rhs)
+    return quotient if (lhs < 0) == (rhs < 0) else -quotient
+
+def c_modulo(lhs, rhs):
+    return lhs - rhs * c_divide(lhs, rhs)
+
+# Floating point division by zero is not an error, it yields a signed infinity or NaN
+def c_float_divide(lhs, rhs):
+    if rhs == 0:
+        if lhs == 0 or lhs != lhs:
+            return math.nan
+        return math.copysign(math.inf, lhs) * math.copysign(1.0, rhs)
+    return lhs / rhs
+
+def c_float_modulo(lhs, rhs):
+    if rhs == 0:
+        return math.nan
+    return math.fmod(lhs, rhs)
+
+def c_shift_left(lhs, rhs):
+    if rhs < 0:
+        raise RuntimeError(None, "Negative shift count")
+    return lhs << rhs
+
+def c_shift_right(lhs, rhs):
+    if rhs < 0:
+        raise RuntimeError(None, "Negative shift count")
+    return lhs >> rhs
+
+def c_integer_operation(lhs, rhs):
+    raise RuntimeError(None, "Bitwise operation on floating point operand")
+
+
+# Binary operator tables, comparisons yield int like they do in C
+
+INT_BINARY_OPERATIONS = {
+    "+":  operator.add,
+    "-":  operator.sub,
+    "*":  operator.mul,
+    "/":  c_divide,
+    "%":  c_modulo,
+    "<<": c_shift_left,
+    ">>": c_shift_right,
+    "&":  operator.and_,
+    "^":  operator.xor,
+    "|":  operator.or_,
+    "<":  lambda lhs, rhs: 1 if lhs < rhs else 0,
+    "<=": lambda lhs, rhs: 1 if lhs <= rhs else 0,
+    ">":  lambda lhs, rhs: 1 if lhs > rhs else 0,
+    ">=": lambda lhs, rhs: 1 if lhs >= rhs else 0,
+    "==": lambda lhs, rhs: 1 if lhs == rhs else 0,
+    "!=": lambda lhs, rhs: 1 if lhs != rhs else 0,
+}
+
+FLOAT_BINARY_OPERATIONS = {
+    **INT_BINARY_OPERATIONS,
+    "/":  c_float_divide,
+    "%":  c_float_modulo,
+    "<<": c_integer_operation,
+    ">>": c_integer_operation,
+    "&":  c_integer_operation,
+    "^":  c_integer_operation,
+    "|":  c_integer_operation,
+}
+
+
+def applyBinaryOperation(operation, lhs, rhs):
+    if type(lhs) is float or type(rhs) is float:
+        return FLOAT_BINARY_OPERATIONS[operation](lhs, rhs)
+    return INT_BINARY_OPERATIONS[operation](lhs, rhs)
+
+
+# Signatures of the functions the interpreter provides itself
+BUILTIN_FUNCTION_TYPES = {
+    "malloc": FunctionType(PointerType(PrimitiveType.VOID), [PrimitiveType.INT]),
+    "calloc": FunctionType(PointerType(PrimitiveType.VOID), [PrimitiveType.INT, PrimitiveType.INT]),
+    "realloc": FunctionType(PointerType(PrimitiveType.VOID), [PointerType(PrimitiveType.VOID), PrimitiveType.INT]),
+    "free": FunctionType(PrimitiveType.VOID, [PointerType(PrimitiveType.VOID)]),
+}
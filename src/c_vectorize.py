@@ -0,0 +1,421 @@
+import operator
+
+from c_ast import *
+from c_types import *
+from c_memory import *
+
+# NumPy is optional, without it every loop runs on the interpreter
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Loops with fewer iterations than this run on the interpreter, below it the
+#   array setup costs more than the iterations it saves
+VECTOR_MIN_TRIP = 16
+
+# Element formats a loop may index, and how each is held in NumPy
+VECTOR_DTYPES = {
+    "b": "int8",
+    "i": "int32",
+    "f": "float32",
+}
+
+# Operators with the same result elementwise as in sequence. Integer results
+#   are computed modulo 2**64, which wraps to the same value as the
+#   interpreter's unbounded integers once stored. Division is left out, C
+#   integer division truncates where NumPy floors
+VECTOR_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+}
+
+BINARY_NODE_TYPES = (
+    NodeType.BinaryOperationExpression,
+    NodeType.IntBinaryOperationExpression,
+    NodeType.FloatBinaryOperationExpression,
+    NodeType.MixedBinaryOperationExpression,
+    NodeType.TypedBinaryOperationExpression,
+)
+
+# An integer of at most this many bits converts to float exactly from int64
+EXACT_INT_BITS = 62
+
+INT_MAX = (1 << 31) - 1
+
+
+def vectorizationAvailable():
+    return numpy is not None
+
+
+# Automatic vectorization
+#   recognizes counted loops whose body is a single assignment over arrays
+#   indexed by the loop counter,
+#
+#       for (i = start; i < n; i++) c[i] = a[i] op b[i];    map
+#       for (i = start; i < n; i++) s += a[i] op b[i];      reduction
+#
+#   and runs them as NumPy operations over views of interpreter memory. The
+#   match is made on the laid out AST so the counter and accumulator are
+#   registers. Aliasing, bounds and the trip count are checked when the loop
+#   starts, any doubt and the loop runs on the interpreter instead, which
+#   gives the same result by definition
+
+class VectorLoop:
+
+    def __init__(self, counter, bound, inclusive, target, format, operation, expression, leaves):
+        # Register slot of the loop counter and the expression it is
+        #   compared against
+        self.counter = counter
+        self.bound = bound
+        self.inclusive = inclusive
+
+        # Subscript stored to for a map, register identifier for a reduction,
+        #   and the format of the value stored
+        self.target = target
+        self.format = format
+        # Combining operator of a reduction or compound assignment, None for `=`
+        self.operation = operation
+
+        # Compiled right-hand side, a function of the resolved leaves
+        self.expression = expression
+        # Operands the expression reads, in leaf order
+        #   ("array", locator, format) an element indexed by the counter
+        #   ("scalar", node, None)      a loop invariant value
+        #   ("counter", None, None)     the counter itself
+        self.leaves = leaves
+
+    def isReduction(self):
+        return self.target.node_type == NodeType.RegisterIdentifier
+
+    # Runs the whole loop and returns True, or returns False without side
+    #   effects when it has to run on the interpreter
+    def run(self, interp):
+        start = interp.registers[self.counter]
+        bound = interp.evaluateExpression(self.bound)
+        if type(start) is not int or type(bound) is not int:
+            return False
+        if self.inclusive:
+            if bound >= INT_MAX:
+                return False
+            bound += 1
+        count = bound - start
+        if count < VECTOR_MIN_TRIP:
+            return False
+
+        memory = interp.memory
+        values = []
+        ranges = []
+        scalar_addresses = []
+        for (kind, node, format) in self.leaves:
+            match kind:
+                case "array":
+                    address = self.elementRange(interp, node, format, start, count)
+                    if address is None:
+                        return False
+                    ranges.append((address, format))
+                    values.append(None)
+                case "scalar":
+                    address = scalarAddress(interp, node)
+                    if address is not None:
+                        scalar_addresses.append(address)
+                    values.append(interp.evaluateExpression(node))
+                case "counter":
+                    values.append(numpy.arange(start, bound, dtype = numpy.int64))
+
+        if not self.isReduction():
+            destination_format = self.format
+            destination = self.elementRange(interp, self.target.children["Locator"], destination_format, start, count)
+            if destination is None:
+                return False
+            destination_end = destination + count * (1 << FORMAT_SHIFTS[destination_format])
+            address = scalarAddress(interp, self.bound)
+            if address is not None:
+                scalar_addresses.append(address)
+            # A store may only overwrite the element the same iteration read
+            for (address, format) in ranges:
+                end = address + count * (1 << FORMAT_SHIFTS[format])
+                if address < destination_end and destination < end and (address, format) != (destination, destination_format):
+                    return False
+            if any(destination <= address < destination_end for address in scalar_addresses):
+                return False
+
+        # NumPy views hold an export of the bytearray, they are dropped before
+        #   anything can grow memory again
+        index = 0
+        for i in range(len(values)):
+            if self.leaves[i][0] == "array":
+                (address, format) = ranges[index]
+                index += 1
+                view = numpy.frombuffer(memory.data, VECTOR_DTYPES[format], count, address)
+                values[i] = view.astype(numpy.float64 if format == "f" else numpy.int64)
+
+        try:
+            with numpy.errstate(all = "ignore"):
+                result = self.expression(values)
+                if self.isReduction():
+                    return self.reduce(interp, result, count, bound)
+                return self.store(interp, result, destination, count, bound)
+        except (OverflowError, TypeError):
+            return False
+
+    # Address of the first element the loop touches through `locator`, None
+    #   if the elements are not all inside memory and aligned
+    def elementRange(self, interp, locator, format, start, count):
+        base = interp.evaluateExpression(locator)
+        if type(base) is not int:
+            return None
+        size = 1 << FORMAT_SHIFTS[format]
+        address = base + start * size
+        if address < NULL_GUARD or address + count * size > interp.memory.size or address % size:
+            return None
+        return address
+
+    def store(self, interp, result, destination, count, bound):
+        format = self.format
+        is_float = format == "f"
+        result = broadcast(result, count, is_float)
+        if self.operation is not None:
+            current = numpy.frombuffer(interp.memory.data, VECTOR_DTYPES[format], count, destination)
+            result = self.operation(current.astype(numpy.float64 if is_float else numpy.int64), result)
+        converted = result.astype(VECTOR_DTYPES[format])
+        # A finite float too large for float32 faults on a scalar store
+        if is_float and not numpy.array_equal(numpy.isfinite(converted), numpy.isfinite(result)):
+            return False
+        numpy.frombuffer(interp.memory.data, VECTOR_DTYPES[format], count, destination)[:] = converted
+        interp.registers[self.counter] = bound
+        return True
+
+    def reduce(self, interp, result, count, bound):
+        slot = self.target.slot
+        convert = STORED_VALUE_CONVERTERS[self.format]
+        accumulator = interp.registers[slot]
+        if self.format == "f":
+            # Every step rounds to float32, so the sum is taken in order
+            operation = self.operation
+            for value in broadcast(result, count, True).tolist():
+                accumulator = convert(operation(accumulator, value))
+        else:
+            values = broadcast(result, count, False)
+            if self.operation is operator.mul:
+                accumulator = convert(accumulator * int(numpy.prod(values)))
+            else:
+                accumulator = convert(self.operation(accumulator, int(numpy.sum(values))))
+        interp.registers[slot] = accumulator
+        interp.registers[self.counter] = bound
+        return True
+
+
+# Memory address of a scalar operand, None for registers and constants
+def scalarAddress(interp, node):
+    match node.node_type:
+        case NodeType.LocalIdentifier:
+            return interp.frame_base + node.offset
+        case NodeType.GlobalIdentifier:
+            return node.address
+    return None
+
+# An expression result as an array of `count` elements, invariant results are
+#   plain Python values and integers wrap to int64 like array elements do
+def broadcast(value, count, is_float):
+    if isinstance(value, numpy.ndarray):
+        return value.astype(numpy.float64) if is_float else value
+    if is_float:
+        return numpy.full(count, float(value))
+    return numpy.full(count, (int(value) + (1 << 63)) % (1 << 64) - (1 << 63), numpy.int64)
+
+
+def stripParentheses(node):
+    while node.node_type == NodeType.Parenthetical:
+        node = node.children["Group"]
+    return node
+
+def isRegister(node, slot):
+    return node.node_type == NodeType.RegisterIdentifier and node.slot == slot
+
+
+# Pattern matching
+
+def matchVectorLoop(node):
+    if not vectorizationAvailable() or "If" not in node.children:
+        return None
+    condition = stripParentheses(node.children["If"])
+    if condition.node_type not in BINARY_NODE_TYPES or condition.name not in ("<", "<="):
+        return None
+    counter = stripParentheses(condition.children["LeftOperand"])
+    if counter.node_type != NodeType.RegisterIdentifier or counter.format != "i":
+        return None
+    slot = counter.slot
+
+    if not isCounterStep(node.children.get("Step"), slot):
+        return None
+    bound = stripParentheses(condition.children["RightOperand"])
+    if not isInvariantScalar(bound, slot) or bound.ctype not in (PrimitiveType.INT, PrimitiveType.CHAR):
+        return None
+
+    assignment = loopAssignment(node.children["Then"])
+    if assignment is None or assignment.conversion is not None:
+        return None
+    target = stripParentheses(assignment.children["LValue"])
+    rvalue = assignment.children["RValue"]
+    operation = None
+    if assignment.name != "=":
+        operation = VECTOR_OPERATORS.get(assignment.name[:-1])
+        if operation is None:
+            return None
+
+    if target.node_type == NodeType.RegisterIdentifier:
+        if target.slot == slot or isRegister(bound, target.slot) or target.format not in VECTOR_DTYPES:
+            return None
+        # `s = s op E` is `s op= E`
+        if operation is None:
+            (operation, rvalue) = splitAccumulation(rvalue, target.slot)
+            if operation is None:
+                return None
+        accumulator = target.slot
+        format = target.format
+    elif target.node_type == NodeType.Subscript:
+        if not isElement(target, slot):
+            return None
+        accumulator = None
+        format = scalarFormat(target.ctype)
+    else:
+        return None
+
+    leaves = []
+    compiled = compileVector(rvalue, slot, accumulator, leaves)
+    if compiled is None:
+        return None
+    (expression, is_float, _) = compiled
+    if (format == "f") != is_float:
+        return None
+    return VectorLoop(slot, bound, condition.name == "<=", target, format, operation, expression, leaves)
+
+def isCounterStep(step, slot):
+    if step is None:
+        return False
+    step = stripParentheses(step)
+    match step.node_type:
+        case NodeType.PrefixUnaryExpression | NodeType.PostfixUnaryExpression:
+            return step.name == "++" and step.step == 1 and isRegister(stripParentheses(step.children["Operand"]), slot)
+        case NodeType.Assignment:
+            increment = stripParentheses(step.children["RValue"])
+            return (step.name == "+=" and isRegister(stripParentheses(step.children["LValue"]), slot)
+                    and increment.node_type == NodeType.IntLiteral and increment.value == 1)
+    return False
+
+# The loop body's only statement, if it is an assignment
+def loopAssignment(body):
+    if body.node_type == NodeType.CompoundStatement:
+        if len(body.children) != 1:
+            return None
+        body = body.children["Statement1"]
+    if body.node_type != NodeType.ExpressionStatement:
+        return None
+    expression = stripParentheses(body.children["Expression"])
+    return expression if expression.node_type == NodeType.Assignment else None
+
+def splitAccumulation(rvalue, slot):
+    rvalue = stripParentheses(rvalue)
+    if rvalue.node_type in BINARY_NODE_TYPES and rvalue.name in VECTOR_OPERATORS:
+        left = stripParentheses(rvalue.children["LeftOperand"])
+        right = stripParentheses(rvalue.children["RightOperand"])
+        if isRegister(left, slot):
+            return (VECTOR_OPERATORS[rvalue.name], rvalue.children["RightOperand"])
+        if isRegister(right, slot) and rvalue.name != "-":
+            return (VECTOR_OPERATORS[rvalue.name], rvalue.children["LeftOperand"])
+    return (None, None)
+
+def isInvariantScalar(node, slot):
+    match node.node_type:
+        case NodeType.IntLiteral | NodeType.CharacterLiteral:
+            return True
+        case NodeType.RegisterIdentifier:
+            return node.slot != slot
+        case NodeType.LocalIdentifier | NodeType.GlobalIdentifier:
+            return node.format is not None
+    return False
+
+# `locator[counter]` over an array or pointer of a supported element type
+def isElement(node, slot):
+    locator = stripParentheses(node.children["Locator"])
+    if locator.node_type not in (NodeType.RegisterIdentifier, NodeType.LocalIdentifier, NodeType.GlobalIdentifier):
+        return False
+    if not isinstance(locator.ctype, (ArrayType, PointerType)) or isRegister(locator, slot):
+        return False
+    return isRegister(stripParentheses(node.children["Index"]), slot) and scalarFormat(node.ctype) in VECTOR_DTYPES
+
+# Compiles an elementwise expression to a function of its leaves' values.
+#   Returns (function, is_float, bits), `bits` bounding the magnitude of an
+#   integer result while it stays exact, or None if the expression cannot
+#   be evaluated elementwise
+def compileVector(node, slot, accumulator, leaves):
+    node = stripParentheses(node)
+    match node.node_type:
+        case NodeType.IntLiteral | NodeType.CharacterLiteral:
+            value = node.value if node.node_type == NodeType.IntLiteral else ord(node.value)
+            if not -INT_MAX <= value <= INT_MAX:
+                return None
+            return (lambda values: value, False, value.bit_length() + 1)
+        case NodeType.FloatLiteral:
+            value = node.value
+            return (lambda values: value, True, 0)
+        case NodeType.RegisterIdentifier | NodeType.LocalIdentifier | NodeType.GlobalIdentifier:
+            if isRegister(node, slot):
+                return leafOf(leaves, ("counter", None, None), False, 32)
+            if node.format not in VECTOR_DTYPES or isRegister(node, accumulator):
+                return None
+            return leafOf(leaves, ("scalar", node, None), node.format == "f", 8 << FORMAT_SHIFTS[node.format])
+        case NodeType.Subscript:
+            if not isElement(node, slot):
+                return None
+            format = scalarFormat(node.ctype)
+            locator = stripParentheses(node.children["Locator"])
+            return leafOf(leaves, ("array", locator, format), format == "f", 8 << FORMAT_SHIFTS[format])
+        case NodeType.Cast:
+            operand = compileVector(node.children["Operand"], slot, accumulator, leaves)
+            if operand is None:
+                return None
+            (function, is_float, bits) = operand
+            match node.ctype:
+                case PrimitiveType.FLOAT if is_float:
+                    return operand
+                case PrimitiveType.FLOAT if bits <= EXACT_INT_BITS:
+                    return (lambda values: toFloat(function(values)), True, 0)
+                case PrimitiveType.INT if not is_float:
+                    return operand
+            return None
+        case NodeType.PrefixUnaryExpression if node.name == "-":
+            operand = compileVector(node.children["Operand"], slot, accumulator, leaves)
+            if operand is None:
+                return None
+            (function, is_float, bits) = operand
+            return (lambda values: -function(values), is_float, bits + 1)
+        case node_type if node_type in BINARY_NODE_TYPES and node.name in VECTOR_OPERATORS:
+            left = compileVector(node.children["LeftOperand"], slot, accumulator, leaves)
+            right = compileVector(node.children["RightOperand"], slot, accumulator, leaves)
+            if left is None or right is None:
+                return None
+            (left_function, left_float, left_bits) = left
+            (right_function, right_float, right_bits) = right
+            is_float = node.ctype == PrimitiveType.FLOAT
+            # Integer operands of float arithmetic must still be exact
+            if is_float and ((not left_float and left_bits > EXACT_INT_BITS) or (not right_float and right_bits > EXACT_INT_BITS)):
+                return None
+            if not is_float and (left_float or right_float):
+                return None
+            operation = VECTOR_OPERATORS[node.name]
+            bits = left_bits + right_bits if node.name == "*" else max(left_bits, right_bits) + 1
+            return (lambda values: operation(left_function(values), right_function(values)), is_float, bits)
+    return None
+
+def leafOf(leaves, leaf, is_float, bits):
+    index = len(leaves)
+    leaves.append(leaf)
+    return (lambda values: values[index], is_float, bits)
+
+def toFloat(value):
+    if isinstance(value, numpy.ndarray):
+        return value.astype(numpy.float64)
+    return float(value)
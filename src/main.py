@@ -1,26 +1,32 @@
+import argparse
 import sys
-from c_lex import *
-from src.c_ast import *     # type: ignore
-from c_parse import *
-from src.c_interpreter import *
+
+from c_error import Error
+from c_interpreter import *
 
 
 def main():
-    argv = sys.argv
-    argc = len(argv)
+    parser = argparse.ArgumentParser(prog="pcc", description="Interprets a C source file")
+    parser.add_argument("filename", help="C source file to run")
+    parser.add_argument("-O", dest="optimize", type=int, default=DEFAULT_OPTIMIZE_LEVEL,
+                        choices=range(OPTIMIZE_FULL + 1), metavar="LEVEL",
+                        help=f"optimization level, 0 to {OPTIMIZE_FULL}, -O alone enables all (default {DEFAULT_OPTIMIZE_LEVEL})")
+    parser.add_argument("-d", "--debug", action="store_true", help="trace parsing and evaluation")
+    parser.add_argument("--no-typecheck", dest="typecheck", action="store_false", help="skip static type checking")
+    parser.add_argument("--memoize", action="store_true", help="cache the results of pure functions")
+    # `-O` without a level, like `-O2`
+    argv = [f"-O{OPTIMIZE_FULL}" if arg == "-O" else arg for arg in sys.argv[1:]]
+    args = parser.parse_args(argv)
 
-    if not 1 < argc < 3:
-        print("Usage: pcc <filename>")
-        sys.exit()
+    try:
+        interp = Interpreter(args.filename, args.debug, args.typecheck, optimize=args.optimize, memoize=args.memoize)
+        result = interp.run()
+    except Error as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
         
-    interp = Interpreter("test.c", True)
-    
-    print(interp.evaluateDeclaration(interp.ast))
+    sys.exit(result if isinstance(result, int) else 0)
     
     
 if __name__ == "__main__":
     main()
-
-
-
-
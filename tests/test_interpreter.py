@@ -0,0 +1,449 @@
+import os
+import sys
+import unittest
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from c_ast import FloatLiteral, NodeType
+from c_error import RuntimeError, StackOverflowError, TypeError
+from c_interpreter import Interpreter
+from c_optimize import OPTIMIZE_NONE
+
+
+def interpret(source, typecheck = True, **options):
+    with patch("builtins.open", new_callable=mock_open, read_data=source):
+        interp = Interpreter("fakefile.c", typecheck=typecheck, **options)
+    interp.evaluateModule(interp.ast)
+    return interp
+
+
+def declaration_value(interp, statement_number):
+    statement = interp.ast.children[f"Statement{statement_number}"]
+    return statement.children["Decl1"].children["RValue"]
+
+
+class QuickeningTest(unittest.TestCase):
+
+    def test_int_int_specialization(self):
+        interp = interpret("int x = 7 / 2 + 3 * 4;", typecheck=False, optimize=OPTIMIZE_NONE)
+        self.assertEqual(interp.readVariable("x"), 15)
+        self.assertEqual(declaration_value(interp, 1).node_type, NodeType.IntBinaryOperationExpression)
+
+    def test_float_and_mixed_specialization(self):
+        interp = interpret("float a = 1.5; float b = a * 2.0; float c = a + 1;", typecheck=False)
+        self.assertEqual(interp.readVariable("b"), 3.0)
+        self.assertEqual(interp.readVariable("c"), 2.5)
+        self.assertEqual(declaration_value(interp, 2).node_type, NodeType.FloatBinaryOperationExpression)
+        self.assertEqual(declaration_value(interp, 3).node_type, NodeType.MixedBinaryOperationExpression)
+
+    def test_c_division_semantics(self):
+        interp = interpret("int q = 0 - 7 / 2; int r = (0 - 7) % 2; int s = 7 / (0 - 2);")
+        self.assertEqual(interp.readVariable("q"), -3)
+        self.assertEqual(interp.readVariable("r"), -1)
+        self.assertEqual(interp.readVariable("s"), -3)
+
+    def test_deoptimizes_on_type_change(self):
+        interp = interpret("int x = 3; int y = x + 1;", typecheck=False)
+        node = declaration_value(interp, 2)
+        self.assertEqual(node.node_type, NodeType.IntBinaryOperationExpression)
+
+        node.children["LeftOperand"] = FloatLiteral(2.5)
+        self.assertEqual(interp.evaluateExpression(node), 3.5)
+        self.assertEqual(node.node_type, NodeType.BinaryOperationExpression)
+        self.assertEqual(node.deopt_count, 1)
+
+        self.assertEqual(interp.evaluateExpression(node), 3.5)
+        self.assertEqual(node.node_type, NodeType.MixedBinaryOperationExpression)
+
+    def test_typed_nodes_skip_guards(self):
+        interp = interpret("float a = 1.5; float c = a + 1; int i = 7 / 2;", optimize=OPTIMIZE_NONE)
+        self.assertEqual(interp.readVariable("c"), 2.5)
+        self.assertEqual(interp.readVariable("i"), 3)
+        node = declaration_value(interp, 2)
+        self.assertEqual(node.node_type, NodeType.TypedBinaryOperationExpression)
+        self.assertEqual(node.children["RightOperand"].node_type, NodeType.Cast)
+
+    def test_comparisons_yield_int(self):
+        interp = interpret("int t = 2 < 3; int f = 2.0 >= 3;")
+        self.assertIs(type(interp.readVariable("t")), int)
+        self.assertEqual(interp.readVariable("t"), 1)
+        self.assertEqual(interp.readVariable("f"), 0)
+
+    def test_logical_operators_yield_int(self):
+        interp = interpret("int a = 2; int b = 0; int c = (a && b) + 1; int d = (a || b) + 1;", typecheck=False)
+        self.assertEqual(interp.readVariable("c"), 1)
+        self.assertEqual(interp.readVariable("d"), 2)
+        statement = interp.ast.children["Statement3"].children["Decl1"].children["RValue"]
+        self.assertEqual(statement.node_type, NodeType.IntBinaryOperationExpression)
+
+    def test_compound_integer_assignments(self):
+        interp = interpret("int x = 5; x <<= 2; int y = 22; y %= 4; int z = 12; z &= 10; z |= 1; z ^= 3; int w = 0 - 8; w >>= 1;")
+        self.assertEqual(interp.readVariable("x"), 20)
+        self.assertEqual(interp.readVariable("y"), 2)
+        self.assertEqual(interp.readVariable("z"), 10)
+        self.assertEqual(interp.readVariable("w"), -4)
+
+    def test_division_by_zero(self):
+        with self.assertRaises(RuntimeError):
+            interpret("int z = 0; int q = 1 / z;")
+        with self.assertRaises(RuntimeError):
+            interpret("int z = 0; int r = 1 % z;")
+        interp = interpret("float z = 0.0; float inf = 1.0 / z; float nan = z / z;")
+        self.assertEqual(interp.readVariable("inf"), float("inf"))
+        self.assertNotEqual(interp.readVariable("nan"), interp.readVariable("nan"))
+
+
+class MemoryModelTest(unittest.TestCase):
+
+    def test_pointers(self):
+        interp = interpret("""
+            int x = 5;
+            int *p = &x;
+            int y = *p + 1;
+            *p = 10;
+            int **pp = &p;
+            int z = **pp;
+        """)
+        self.assertEqual(interp.readVariable("x"), 10)
+        self.assertEqual(interp.readVariable("y"), 6)
+        self.assertEqual(interp.readVariable("z"), 10)
+        self.assertEqual(interp.readVariable("p"), interp.lookupVariable("x")[0])
+
+    def test_arrays_are_contiguous(self):
+        interp = interpret("""
+            int a[4] = {1, 2, 3};
+            int *p = a + 1;
+            p[1] = 7;
+            int last = a[3];
+            int distance = &a[3] - p;
+            p++;
+            int third = *p;
+        """)
+        base = interp.lookupVariable("a")[0]
+        self.assertEqual(interp.memory.readBytes(base, 16), bytes([1, 0, 0, 0, 2, 0, 0, 0, 7, 0, 0, 0, 0, 0, 0, 0]))
+        self.assertEqual(interp.readVariable("last"), 0)
+        self.assertEqual(interp.readVariable("distance"), 2)
+        self.assertEqual(interp.readVariable("third"), 7)
+
+    def test_struct_fields_at_fixed_offsets(self):
+        interp = interpret("""
+            struct Pair { char tag; int value; float weight; };
+            struct Pair a = {'x', 42, 0.5};
+            struct Pair b;
+            struct Pair *p = &b;
+            b = a;
+            p->value = p->value + 1;
+            int v = b.value;
+            float w = p->weight;
+        """)
+        (address, struct_type) = interp.lookupVariable("a")
+        self.assertEqual(struct_type.offsets, {"tag": 0, "value": 4, "weight": 8})
+        self.assertEqual(struct_type.size, 12)
+        self.assertEqual(interp.memory.load(address + 4, "i"), 42)
+        self.assertEqual(interp.readVariable("v"), 43)
+        self.assertEqual(interp.readVariable("w"), 0.5)
+
+    def test_integer_stores_wrap(self):
+        interp = interpret("int big = 2147483647; int wrapped = big + 1; char c = 'a'; char *s = \"hi\"; char h = s[1];")
+        self.assertEqual(interp.readVariable("wrapped"), -2147483648)
+        self.assertEqual(interp.readVariable("h"), ord("i"))
+
+    def test_expression_value_is_stored_value(self):
+        interp = interpret("char c = 127; int r = ++c;")
+        self.assertEqual(interp.readVariable("r"), -128)
+
+    def test_untyped_memory_access_needs_type_checking(self):
+        for source in ["int x = 1; int *p = &x;", "int x = 1; int y = *(&x);"]:
+            with self.subTest(source=source):
+                with self.assertRaises(RuntimeError):
+                    interpret(source, typecheck=False)
+
+    def test_null_dereference_faults(self):
+        with self.assertRaises(RuntimeError):
+            interpret("int *p = 0; int x = *p;")
+
+
+class StackTest(unittest.TestCase):
+
+    def test_recursive_calls_get_own_frames(self):
+        interp = interpret("""
+            int fib(int n) {
+                if (n < 2) { return n; }
+                return fib(n - 1) + fib(n - 2);
+            }
+            int x = fib(15);
+        """)
+        self.assertEqual(interp.readVariable("x"), 610)
+        self.assertEqual(interp.stack.used(), 0)
+
+    def test_locals_resolved_to_frame_offsets(self):
+        interp = interpret("""
+            int g = 5;
+            int sum(int a, int b) {
+                int values[3] = {a, b, g};
+                char c = 'z';
+                return values[0] + values[1] + values[2];
+            }
+            int s = sum(1, 2);
+        """)
+        function = interp.function_map["sum"]
+        # Only the array is in the frame, the scalars are kept in registers
+        self.assertEqual([slot[0] for slot in function.parameter_slots], [0, 1])
+        self.assertEqual(function.register_count, 3)
+        self.assertEqual(function.frame_size, 12)
+        self.assertEqual(interp.readVariable("s"), 8)
+
+    def test_only_addressed_locals_live_in_memory(self):
+        interp = interpret("""
+            float g = 0.1;
+            int f(int n) {
+                int x = n;
+                int y = n + 1;
+                int *p = &y;
+                *p = *p + 1;
+                char c = 127;
+                c++;
+                x += 2;
+                return x + y + c;
+            }
+            int r = f(10);
+            int floats() { float local = 0.1; return local == g; }
+            int h = floats();
+        """)
+        function = interp.function_map["f"]
+        self.assertEqual(function.frame_size, 4)
+        self.assertEqual(function.register_count, 4)
+        self.assertEqual(interp.readVariable("r"), 12 + 12 - 128)
+        # Registers round floats like memory does
+        self.assertEqual(interp.readVariable("h"), 1)
+        
+        untyped = interpret("int f(int n) { int x = n; return x; } int r = f(3);", typecheck=False)
+        self.assertEqual(untyped.function_map["f"].register_count, 0)
+        self.assertEqual(untyped.readVariable("r"), 3)
+
+    def test_stack_overflow_is_reported(self):
+        source = "int down(int n) { int buffer[64]; return down(n + 1); } int x = down(0);"
+        with self.assertRaises(StackOverflowError):
+            interpret(source, stack_size=1024)
+
+    def test_arena_bounds_recursion_depth(self):
+        source = """
+            int depth(int n) {
+                if (n == 0) { return 0; }
+                return depth(n - 1) + 1;
+            }
+            int d = depth(10000);
+        """
+        self.assertEqual(interpret(source).readVariable("d"), 10000)
+        with self.assertRaises(StackOverflowError):
+            interpret(source, stack_size=8 * 1024)
+
+    def test_struct_results_are_copied_to_caller(self):
+        interp = interpret("""
+            struct Box { int value; };
+            struct Box make(int value) {
+                struct Box box;
+                box.value = value;
+                return box;
+            }
+            int add(struct Box a, struct Box b) {
+                return a.value + b.value;
+            }
+            int sum() {
+                return add(make(1), make(2));
+            }
+            int local = sum();
+            int global = add(make(3), make(4));
+        """)
+        self.assertEqual(interp.readVariable("local"), 3)
+        self.assertEqual(interp.readVariable("global"), 7)
+
+    def test_tail_calls_run_in_constant_stack(self):
+        interp = interpret("""
+            int count(int n, int total) {
+                if (n == 0) { return total; }
+                return count(n - 1, total + 2);
+            }
+            int even(int n);
+            int odd(int n) {
+                if (n == 0) { return 0; }
+                return even(n - 1);
+            }
+            int even(int n) {
+                if (n == 0) { return 1; }
+                return odd(n - 1);
+            }
+            int c = count(5000, 0);
+            int e = even(3001);
+        """, stack_size=1024)
+        self.assertEqual(interp.readVariable("c"), 10000)
+        self.assertEqual(interp.readVariable("e"), 0)
+        self.assertTrue(interp.function_map["count"].statements[1].tail_call)
+
+    def test_no_tail_call_from_escaping_frames(self):
+        interp = interpret("""
+            int get(int *p) { return *p; }
+            int first(int *values) { return values[0]; }
+            int scalar() { int x = 42; return get(&x); }
+            int array() { int values[2] = {7, 8}; return first(values); }
+            int a = scalar();
+            int b = array();
+        """)
+        self.assertEqual(interp.readVariable("a"), 42)
+        self.assertEqual(interp.readVariable("b"), 7)
+        self.assertFalse(interp.function_map["scalar"].statements[1].tail_call)
+
+    def test_call_sites_cache_callee(self):
+        interp = interpret("int twice(int n) { return n * 2; } int x = twice(4);")
+        call = interp.ast.children["Statement2"].children["Decl1"].children["RValue"]
+        self.assertIs(call.function, interp.function_map["twice"])
+        self.assertEqual(interp.readVariable("x"), 8)
+
+    def test_function_redefinition_is_rejected(self):
+        with self.assertRaises(RuntimeError):
+            interpret("int f() { return 1; } int f() { return 2; }", typecheck=False)
+
+    def test_frames_are_released_after_errors(self):
+        interp = interpret("""
+            int fault(int n) {
+                int *p = 0;
+                return *p + n;
+            }
+            int ok(int n) { return n + 1; }
+        """)
+        with self.assertRaises(RuntimeError):
+            interp.executeFunction("fault", [1])
+        self.assertEqual(interp.stack.used(), 0)
+        self.assertIsNone(interp.frame_base)
+        self.assertEqual(interp.executeFunction("ok", [1]), 2)
+
+
+class MemoizationTest(unittest.TestCase):
+
+    def test_pure_calls_are_cached(self):
+        source = """
+            int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+            int paths(int rows, int columns) {
+                if (rows == 0 || columns == 0) { return 1; }
+                return paths(rows - 1, columns) + paths(rows, columns - 1);
+            }
+            int x = fib(60);
+            int p = paths(16, 16);
+        """
+        interp = interpret(source, memoize=True)
+        self.assertEqual(interp.readVariable("x"), (1548008755920 + (1 << 31)) % (1 << 32) - (1 << 31))
+        self.assertEqual(interp.readVariable("p"), 601080390)
+        info = interp.function_map["fib"].memo.cache_info()
+        self.assertEqual((info.misses, info.hits), (61, 58))
+        self.assertIsNone(interpret(source.replace("int x = fib(60);", ""))
+                          .function_map["fib"].memo)
+
+    def test_impure_calls_always_run(self):
+        interp = interpret("""
+            int calls = 0;
+            int count(int n) { calls++; return n; }
+            float half(float x) { return x / 2; }
+            int a = count(1) + count(1);
+            float h = half(0.1) + half(0.1);
+        """, memoize=True)
+        self.assertEqual(interp.readVariable("calls"), 2)
+        self.assertIsNone(interp.function_map["count"].memo)
+        info = interp.function_map["half"].memo.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
+
+class HeapTest(unittest.TestCase):
+
+    def test_linked_list_on_heap(self):
+        interp = interpret("""
+            struct Node { int value; struct Node *next; };
+            struct Node *push(struct Node *head, int value) {
+                struct Node *node = malloc(16);
+                node->value = value;
+                node->next = head;
+                return node;
+            }
+            int sum(struct Node *node) {
+                if (node == 0) { return 0; }
+                return node->value + sum(node->next);
+            }
+            struct Node *list = push(push(push(0, 1), 2), 3);
+            int total = sum(list);
+            int *zeros = calloc(4, 4);
+            int zero = zeros[3];
+        """)
+        self.assertEqual(interp.readVariable("total"), 6)
+        self.assertEqual(interp.readVariable("zero"), 0)
+        self.assertEqual(interp.heap.stats()["in_use"], 64)
+
+
+class LoopTest(unittest.TestCase):
+
+    def test_while_and_for_loops(self):
+        interp = interpret("""
+            int total = 0;
+            int i = 0;
+            while (i < 10) {
+                int square = i * i;
+                total += square;
+                i++;
+            }
+            int count = 0;
+            for (int j = 0; j < 5; j++) count++;
+            for (int j = 10; j > 0; j = j - 3) { count = count + 10; }
+        """)
+        self.assertEqual(interp.readVariable("total"), 285)
+        self.assertEqual(interp.readVariable("count"), 45)
+        self.assertEqual(interp.stack.used(), 0)
+
+    def test_break_and_continue(self):
+        interp = interpret("""
+            int odd_sum(int limit) {
+                int sum = 0;
+                for (int i = 0; ; i++) {
+                    if (i >= limit) { break; }
+                    if (i % 2 == 0) { continue; }
+                    sum += i;
+                }
+                return sum;
+            }
+            int find(int target) {
+                int i = 0;
+                while (1) {
+                    int j = 0;
+                    while (j < 3) {
+                        if (i * 3 + j == target) { return i * 10 + j; }
+                        j++;
+                    }
+                    i++;
+                }
+                return 0 - 1;
+            }
+            int a = odd_sum(10);
+            int b = find(7);
+        """)
+        self.assertEqual(interp.readVariable("a"), 25)
+        self.assertEqual(interp.readVariable("b"), 21)
+
+    def test_loop_heads_are_precompiled(self):
+        interp = interpret("""
+            float scale(int n) {
+                float x = 1.0;
+                for (int i = 0; i < n; ++i) { x *= 2; }
+                return x;
+            }
+            float f = scale(4);
+        """)
+        loop = interp.function_map["scale"].statements[1]
+        self.assertEqual(interp.readVariable("f"), 16.0)
+        self.assertIsNotNone(loop.condition)
+        self.assertIsNotNone(loop.advance)
+
+    def test_jumps_outside_loops_are_rejected(self):
+        with self.assertRaises(TypeError):
+            interpret("int f() { break; return 0; }")
+
+
+if __name__ == "__main__":
+    unittest.main()
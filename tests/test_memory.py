@@ -0,0 +1,106 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from c_error import RuntimeError
+from c_memory import Heap, Memory, NULL_GUARD, SMALL_BLOCK_LIMIT
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_typed_views_share_bytes(self):
+        memory = Memory(64)
+        address = memory.allocate(4, 4)
+        memory.store(address, "i", 0x01020304)
+        self.assertEqual(memory.load(address, "b"), 0x04)
+        self.assertEqual(memory.load(address + 3, "b"), 0x01)
+
+    def test_allocation_is_aligned(self):
+        memory = Memory(64)
+        memory.allocate(1, 1)
+        self.assertEqual(memory.allocate(4, 4) % 4, 0)
+        self.assertEqual(memory.allocate(8, 8) % 8, 0)
+
+    def test_grow_preserves_contents(self):
+        memory = Memory(32)
+        address = memory.allocate(4, 4)
+        memory.store(address, "f", 1.5)
+        far = memory.allocate(256, 8)
+        memory.store(far, "Q", 7)
+        self.assertGreaterEqual(memory.size, far + 256)
+        self.assertEqual(memory.load(address, "f"), 1.5)
+        self.assertEqual(memory.load(far, "Q"), 7)
+
+    def test_bulk_copy_and_fill(self):
+        memory = Memory(64)
+        source = memory.allocate(8, 4)
+        destination = memory.allocate(8, 4)
+        memory.writeBytes(source, b"abcdefgh")
+        memory.copy(destination, source, 8)
+        self.assertEqual(memory.readBytes(destination, 8), b"abcdefgh")
+        memory.fill(destination, 4)
+        self.assertEqual(memory.readBytes(destination, 8), b"\0\0\0\0efgh")
+
+    def test_out_of_range_values_wrap(self):
+        memory = Memory(64)
+        address = memory.allocate(4, 4)
+        memory.store(address, "i", 2 ** 32 + 5)
+        self.assertEqual(memory.load(address, "i"), 5)
+        memory.store(address, "b", 200)
+        self.assertEqual(memory.load(address, "b"), -56)
+
+    def test_invalid_access_faults(self):
+        memory = Memory(64)
+        with self.assertRaises(RuntimeError):
+            memory.load(0, "i")
+        with self.assertRaises(RuntimeError):
+            memory.load(NULL_GUARD + 1024, "i")
+
+
+class HeapTest(unittest.TestCase):
+
+    def test_small_blocks_are_recycled_by_size_class(self):
+        heap = Heap(Memory(64), chunk_size=1024)
+        first = heap.allocate(12)
+        second = heap.allocate(12)
+        self.assertEqual(first % 16, 0)
+        self.assertEqual(second - first, 16)
+        heap.free(first)
+        self.assertEqual(heap.allocate(5), first)
+        self.assertNotEqual(heap.allocate(40), first)
+
+    def test_large_blocks_coalesce(self):
+        heap = Heap(Memory(64), chunk_size=4096)
+        blocks = [heap.allocate(SMALL_BLOCK_LIMIT + 64) for _ in range(3)]
+        for address in blocks:
+            heap.free(address)
+        self.assertEqual(heap.large_free, {blocks[0]: 3 * (SMALL_BLOCK_LIMIT + 64)})
+        self.assertEqual(heap.allocate(3 * SMALL_BLOCK_LIMIT), blocks[0])
+
+    def test_realloc_preserves_contents(self):
+        memory = Memory(64)
+        heap = Heap(memory)
+        address = heap.allocate(8)
+        memory.store(address, "i", 1234)
+        moved = heap.reallocate(address, 1024)
+        self.assertEqual(memory.load(moved, "i"), 1234)
+        grown = heap.reallocate(moved, 2048)
+        self.assertEqual(memory.load(grown, "i"), 1234)
+
+    def test_stats_and_invalid_free(self):
+        heap = Heap(Memory(64))
+        a = heap.allocate(100)
+        b = heap.allocate(300)
+        heap.free(a)
+        stats = heap.stats()
+        self.assertEqual((stats["in_use"], stats["peak"], stats["blocks"]), (300, 400, 1))
+        self.assertGreater(stats["fragmentation"], 0)
+        with self.assertRaises(RuntimeError):
+            heap.free(a)
+        heap.free(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+import os
+import sys
+import unittest
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from c_ast import NodeType
+from c_error import RuntimeError
+from c_interpreter import Interpreter
+from c_lexer import Lexer
+from c_optimize import OPTIMIZE_FULL, OPTIMIZE_NONE, Optimizer
+from c_parse import Parser
+from c_typecheck import TypeChecker
+
+
+def optimize(source, *level):
+    with patch("builtins.open", new_callable=mock_open, read_data=source):
+        lexer = Lexer("fakefile.c")
+    ast = TypeChecker(lexer).checkModule(Parser(lexer).parseFile())
+    optimizer = Optimizer(lexer)
+    optimizer.optimizeModule(ast, *level)
+    return (ast, optimizer.report)
+
+
+def interpret(source, **options):
+    with patch("builtins.open", new_callable=mock_open, read_data=source):
+        interp = Interpreter("fakefile.c", **options)
+    interp.evaluateModule(interp.ast)
+    return interp
+
+
+def statement(ast, *path):
+    node = ast
+    for key in path:
+        node = node.children[key]
+    return node
+
+
+class OptimizerTest(unittest.TestCase):
+
+    def test_constant_expressions_are_folded(self):
+        (ast, report) = optimize("int x = (7 / 2 + 3 * 4) * 2; float f = 1 + 0.5; char c = 'a' + 1; int b = -1 && 2 > 1;")
+        x = statement(ast, "Statement1", "Decl1", "RValue")
+        self.assertEqual((x.node_type, x.value), (NodeType.IntLiteral, 30))
+        f = statement(ast, "Statement2", "Decl1", "RValue")
+        self.assertEqual((f.node_type, f.value), (NodeType.FloatLiteral, 1.5))
+        self.assertEqual(statement(ast, "Statement3", "Decl1", "RValue").value, 98)
+        self.assertEqual(statement(ast, "Statement4", "Decl1", "RValue").value, 1)
+        self.assertGreater(report["folded"], 0)
+
+    def test_runtime_errors_are_not_folded(self):
+        (ast, _) = optimize("int x = 1 / 0;")
+        self.assertEqual(statement(ast, "Statement1", "Decl1", "RValue").node_type, NodeType.BinaryOperationExpression)
+        with self.assertRaises(RuntimeError):
+            interpret("int x = 1 / 0;")
+
+    def test_unmodified_constants_are_propagated(self):
+        (ast, report) = optimize("""
+            int size = 4;
+            int step = 1;
+            int scaled(int n) { step++; return n * (size * 2); }
+        """)
+        body = statement(ast, "Statement3", "Body")
+        product = statement(body, "Statement2", "Ret")
+        self.assertEqual(product.children["RightOperand"].value, 8)
+        self.assertEqual(statement(body, "Statement1", "Expression", "Operand").node_type, NodeType.Identifier)
+        self.assertEqual(report["propagated"], 1)
+
+    def test_dead_code_is_removed(self):
+        (ast, report) = optimize("""
+            int pick(int n) {
+                if (0) { n = 1; } else { n = n + 2; }
+                while (0) { n = 3; }
+                if (1 > 2) { n = 4; }
+                4 + 5;
+                return n;
+                n = 5;
+            }
+        """)
+        body = statement(ast, "Statement1", "Body")
+        self.assertEqual(list(body.children), ["Statement1", "Statement2"])
+        self.assertEqual(statement(body, "Statement1").node_type, NodeType.CompoundStatement)
+        self.assertEqual(statement(body, "Statement2").node_type, NodeType.ReturnStatement)
+        self.assertEqual(report["branches_removed"], 3)
+        self.assertEqual(report["statements_removed"], 2)
+
+    def test_optimized_programs_behave_the_same(self):
+        source = """
+            int limit = 10;
+            int run(int n) {
+                int total = 0;
+                for (int i = 0; 1; i++) {
+                    if (i >= limit) { break; }
+                    if (0) { total = 0 - 1; }
+                    total += i * (2 + 1);
+                }
+                return total + n;
+            }
+            int a = run(1);
+            float half = 1 / 2.0;
+        """
+        optimized = interpret(source)
+        plain = interpret(source, optimize=OPTIMIZE_NONE)
+        self.assertEqual(optimized.readVariable("a"), plain.readVariable("a"))
+        self.assertEqual(optimized.readVariable("a"), 136)
+        self.assertEqual(optimized.readVariable("half"), 0.5)
+        self.assertGreater(optimized.optimizations["branches_removed"], 0)
+        self.assertEqual(plain.optimizations["folded"], 0)
+
+
+
+KERNEL = """
+    int kernel(int n, int scale) {
+        int a[64];
+        int total = 0;
+        for (int i = 0; i < n; i++) {
+            for (int j = 0; j < n; j++) {
+                a[i*n + j] = i - j;
+                total = total + a[i*n + j] * (scale * 2) / (n + 1);
+            }
+        }
+        return total;
+    }
+    int result = kernel(8, 3);
+"""
+
+
+class LoopOptimizerTest(unittest.TestCase):
+
+    def test_invariants_are_hoisted_out_of_loops(self):
+        (ast, report) = optimize(KERNEL, OPTIMIZE_FULL)
+        body = statement(ast, "Statement1", "Body")
+        # scale * 2 and n + 1 leave both loops, i * n leaves the inner one
+        hoisted = [statement(body, f"Statement{i}", "Decl1", "RValue") for i in (3, 4)]
+        self.assertEqual([node.name for node in hoisted], ["*", "+"])
+        self.assertEqual(statement(hoisted[0], "LeftOperand").name, "scale")
+        self.assertEqual(statement(body, "Statement5").node_type, NodeType.ConditionalStatement)
+        row = statement(body, "Statement5", "Then", "Statement1", "Decl1", "RValue")
+        self.assertEqual([row.name, row.children["LeftOperand"].name], ["*", "i"])
+        self.assertEqual(report["hoisted"], 3)
+
+    def test_repeated_expressions_are_computed_once(self):
+        (ast, report) = optimize(KERNEL, OPTIMIZE_FULL)
+        inner = statement(ast, "Statement1", "Body", "Statement5", "Then", "Statement2", "Then")
+        index = statement(inner, "Statement1", "Decl1")
+        self.assertEqual(index.children["RValue"].name, "+")
+        store = statement(inner, "Statement2", "Expression", "LValue", "Index")
+        self.assertIs(store.declaration, index)
+        self.assertEqual(report["reused"], 1)
+
+    def test_written_and_addressed_variables_stay(self):
+        (ast, report) = optimize("""
+            int f(int n, int m) {
+                int total = 0;
+                int *p = &m;
+                for (int i = 0; i < n; i++) {
+                    total = total + m * 2 + n / i;
+                    n = n - 1;
+                }
+                return total + (n * 3) + (n * 3);
+            }
+        """, OPTIMIZE_FULL)
+        self.assertEqual(report["hoisted"], 0)
+        # `n` is last written before the return, the repeated product is shared
+        self.assertEqual(report["reused"], 1)
+
+    def test_loop_optimizations_preserve_results(self):
+        source = KERNEL + "int check(int x) { int y = x * x; x = x + 1; return y + x * x + x * x; } int c = check(3);"
+        optimized = interpret(source, optimize=OPTIMIZE_FULL)
+        plain = interpret(source, optimize=OPTIMIZE_NONE)
+        self.assertEqual(optimized.readVariable("result"), plain.readVariable("result"))
+        self.assertEqual(optimized.readVariable("c"), 9 + 16 + 16)
+        self.assertEqual(plain.readVariable("c"), 9 + 16 + 16)
+
+
+
+class InliningTest(unittest.TestCase):
+
+    def test_small_functions_are_inlined_with_renamed_parameters(self):
+        source = """
+            int add(int x, int y) { return x + y; }
+            int twice(int x) { return add(x, x); }
+            int run(int x, int y) {
+                int counter = 0;
+                int swapped = add(y, x * 10);
+                int doubled = twice(counter++);
+                return swapped + doubled + counter;
+            }
+            int result = run(1, 2);
+        """
+        (ast, report) = optimize(source, OPTIMIZE_FULL)
+        self.assertEqual(report["inlined"], 3)
+        calls = [node for node in ast.get_children() if node.node_type == NodeType.FunctionCall]
+        self.assertEqual([call.children["Callee"].name for call in calls], ["run"])
+        self.assertEqual(interpret(source, optimize=OPTIMIZE_FULL).readVariable("result"), 12 + 0 + 1)
+
+    def test_recursive_and_shadowed_functions_are_not_inlined(self):
+        source = """
+            int g = 5;
+            int down(int n) { return n > 0 && down(n - 1); }
+            int get() { return g; }
+            int run() { int g = 1; return get() + g + down(3); }
+            int result = run();
+            g++;
+        """
+        (_, report) = optimize(source, OPTIMIZE_FULL)
+        self.assertEqual(report["inlined"], 0)
+        self.assertEqual(interpret(source, optimize=OPTIMIZE_FULL).readVariable("result"), 6)
+
+    def test_unreachable_functions_are_removed(self):
+        source = """
+            int helper(int n) { return n + 1; }
+            int unused(int n) { return helper(n) * 2; }
+            int setup(int n) { int m = n; return m; }
+            int value = setup(4);
+            int main() { return helper(value); }
+        """
+        interp = interpret(source, optimize=OPTIMIZE_FULL)
+        self.assertEqual(sorted(interp.function_map), ["main", "setup"])
+        self.assertEqual(interp.optimizations["functions_removed"], 2)
+        self.assertEqual(interp.executeFunction("main", []), 5)
+        
+        # Without a main any function may be called from outside
+        library = interpret(source.replace("int main() { return helper(value); }", ""), optimize=OPTIMIZE_FULL)
+        self.assertIn("unused", library.function_map)
+
+
+
+class PurityTest(unittest.TestCase):
+
+    def test_pure_functions_are_identified(self):
+        source = """
+            int limit = 10;
+            int counter = 0;
+            int fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+            int even(int n);
+            int odd(int n) { if (n == 0) { return 0; } return even(n - 1); }
+            int even(int n) { if (n == 0) { return 1; } return odd(n - 1); }
+            int clamp(int n) { int values[2] = {n, limit}; int *p = values; return p[n > limit]; }
+            int count(int n) { counter++; return n; }
+            int uses(int n) { return count(n) + fib(n); }
+            int deref(int *p) { return *p; }
+            int allocates(int n) { return malloc(n) != 0; }
+            float scaled(float x) { return x * counter; }
+        """
+        (ast, _) = optimize(source)
+        pure = Optimizer(None).markPureFunctions(ast)
+        self.assertEqual(pure, {"fib", "odd", "even", "clamp"})
+        functions = [statement for statement in ast.children.values() if statement.node_type == NodeType.Function]
+        self.assertEqual({function.name for function in functions if function.pure}, pure)
+
+
+if __name__ == "__main__":
+    unittest.main()
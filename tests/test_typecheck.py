@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from c_ast import NodeType
+from c_error import TypeError
+from c_lexer import Lexer
+from c_parse import Parser
+from c_typecheck import TypeChecker
+from c_types import ArrayType, PointerType, PrimitiveType, StructType
+
+
+def check(source):
+    with patch("builtins.open", new_callable=mock_open, read_data=source):
+        lexer = Lexer("fakefile.c")
+    ast = Parser(lexer).parseFile()
+    return TypeChecker(lexer).checkModule(ast)
+
+
+def statement(ast, *path):
+    node = ast
+    for key in path:
+        node = node.children[key]
+    return node
+
+
+class TypeCheckerTest(unittest.TestCase):
+
+    def test_declarator_types(self):
+        ast = check("int *p; int a[3]; int *b[2]; int m[2][3];")
+        self.assertEqual(statement(ast, "Statement1", "Decl1", "Operand").ctype, PointerType(PrimitiveType.INT))
+        self.assertEqual(statement(ast, "Statement2", "Decl1", "Locator").ctype, ArrayType(PrimitiveType.INT, 3))
+        self.assertEqual(statement(ast, "Statement3", "Decl1", "Operand", "Locator").ctype,
+                         ArrayType(PointerType(PrimitiveType.INT), 2))
+        self.assertEqual(statement(ast, "Statement4", "Decl1", "Locator", "Locator").ctype,
+                         ArrayType(ArrayType(PrimitiveType.INT, 3), 2))
+
+    def test_implicit_conversions(self):
+        ast = check("int i = 2; float f = i; float g = f * i;")
+        initializer = statement(ast, "Statement2", "Decl1", "RValue")
+        self.assertEqual(initializer.node_type, NodeType.Cast)
+        self.assertEqual(initializer.ctype, PrimitiveType.FLOAT)
+
+        product = statement(ast, "Statement3", "Decl1", "RValue")
+        self.assertEqual(product.ctype, PrimitiveType.FLOAT)
+        self.assertEqual(product.children["RightOperand"].node_type, NodeType.Cast)
+
+    def test_pointers_and_structs(self):
+        ast = check("""
+            struct Node { int value; struct Node *next; };
+            struct Node head;
+            int *p = &head.value;
+            int v = head.next->value + *p;
+        """)
+        self.assertIsInstance(statement(ast, "Statement2", "Decl1").ctype, StructType)
+        self.assertEqual(statement(ast, "Statement3", "Decl1", "RValue").ctype, PointerType(PrimitiveType.INT))
+        self.assertEqual(statement(ast, "Statement4", "Decl1", "RValue").ctype, PrimitiveType.INT)
+
+    def test_functions(self):
+        ast = check("""
+            float scale(float x, int k) { return x * k; }
+            int main() { return scale(2, 3); }
+        """)
+        call = statement(ast, "Statement2", "Body", "Statement1", "Ret")
+        self.assertEqual(call.node_type, NodeType.Cast)
+        self.assertEqual(call.children["Operand"].children["Arg1"].node_type, NodeType.Cast)
+
+    def test_rejects_ill_typed_programs(self):
+        programs = [
+            "int x = y;",
+            "int x; int x;",
+            "struct S { int a; }; struct S s; int x = s + 1;",
+            "struct S { int a; }; struct S s; int x = s.b;",
+            "int x; int y = *x;",
+            "float f; int m = f % 2;",
+            "int a[2]; int b[2]; int c = 1; a = b;",
+            "int f(int a) { return a; } int x = f(1, 2);",
+            "void f() { return 1; }",
+            "int f() { return; }",
+            "int *p = 1;",
+            "void v;",
+        ]
+        for program in programs:
+            with self.subTest(program=program):
+                with self.assertRaises(TypeError):
+                    check(program)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import sys
+import unittest
+from unittest.mock import mock_open, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import c_vectorize
+from c_ast import NodeType
+from c_interpreter import Interpreter
+from c_optimize import OPTIMIZE_NONE
+
+
+def run(source, **options):
+    with patch("builtins.open", new_callable=mock_open, read_data=source):
+        interp = Interpreter("fakefile.c", **options)
+    return (interp.run(), interp)
+
+
+def loops(node):
+    found = []
+    if node is not None:
+        if node.node_type == NodeType.ConditionalStatement and node.is_loop:
+            found.append(node)
+        for child in node.children.values():
+            found.extend(loops(child))
+    return found
+
+
+@unittest.skipUnless(c_vectorize.vectorizationAvailable(), "NumPy is not installed")
+class VectorizeTest(unittest.TestCase):
+
+    # Runs `source` with and without vectorization, the results must agree
+    #   exactly. Returns the result and how many loops ran vectorized
+    def assertSameResult(self, source):
+        (expected, _) = run(source, optimize = OPTIMIZE_NONE)
+        runs = []
+        vector_run = c_vectorize.VectorLoop.run
+        def counted(loop, interp):
+            runs.append(vector_run(loop, interp))
+            return runs[-1]
+        with patch.object(c_vectorize.VectorLoop, "run", counted):
+            (result, interp) = run(source)
+        self.assertEqual(result, expected)
+        self.assertIs(type(result), type(expected))
+        return (result, runs.count(True))
+
+    def test_map_and_reduction_loops_run_vectorized(self):
+        (result, vectorized) = self.assertSameResult("""
+            int main() {
+                int a[1000];
+                int b[1000];
+                int c[1000];
+                for (int i = 0; i < 1000; i++) { a[i] = i * 7; b[i] = i - 500; }
+                for (int i = 0; i < 1000; i++)
+                    c[i] = a[i] * b[i] + 3;
+                int s = 0;
+                for (int i = 0; i < 1000; i++) {
+                    s = s + c[i];
+                }
+                return s % 1000;
+            }
+        """)
+        self.assertEqual(vectorized, 2)
+
+    def test_integer_results_wrap_like_scalar_stores(self):
+        (_, vectorized) = self.assertSameResult("""
+            int main() {
+                int a[100];
+                int c[100];
+                for (int i = 0; i < 100; i++) a[i] = i * 100000;
+                for (int i = 0; i < 100; i++) c[i] = a[i] * a[i] * a[i];
+                int s = 0;
+                for (int i = 0; i < 100; i++) s += c[i] * 3;
+                return s;
+            }
+        """)
+        self.assertEqual(vectorized, 3)
+
+    def test_float_reduction_rounds_every_step(self):
+        (result, vectorized) = self.assertSameResult("""
+            float dot(float *a, float *b, int n) {
+                float s = 0.1;
+                for (int i = 0; i < n; i++) s += a[i] * b[i];
+                return s;
+            }
+            float main() {
+                float x[500];
+                float y[500];
+                for (int i = 0; i < 500; i++) x[i] = i * 0.37;
+                for (int i = 0; i < 500; i++) y[i] = 1.1 - i;
+                return dot(x, y, 500);
+            }
+        """)
+        self.assertIsInstance(result, float)
+        self.assertEqual(vectorized, 3)
+
+    def test_overlapping_arrays_fall_back(self):
+        (_, vectorized) = self.assertSameResult("""
+            int main() {
+                int a[200];
+                for (int i = 0; i < 200; i++) a[i] = i;
+                int *p = a;
+                p = p + 1;
+                for (int i = 0; i < 150; i++) p[i] = a[i] + 1;
+                for (int i = 0; i <= 199; i++) a[i] *= 3;
+                int s = 0;
+                for (int i = 0; i < 200; i++) s += a[i] * i;
+                return s;
+            }
+        """)
+        # The shifted copy reads what earlier iterations stored, in place is safe
+        self.assertEqual(vectorized, 3)
+
+    def test_other_loops_are_not_matched(self):
+        (_, interp) = run("""
+            int g(int x) { return x; }
+            int main() {
+                int a[50];
+                int s = 0;
+                for (int i = 0; i < 50; i++) a[i] = g(i);
+                for (int i = 0; i < 50; i++) { a[i] = i; s += i; }
+                for (int i = 0; i < 50; i += 2) a[i] = i;
+                for (int i = 1; i < 50; i++) a[i] = a[i - 1] / 2;
+                for (int i = 0; i < s; i++) s += a[i];
+                return s;
+            }
+        """)
+        self.assertEqual([loop.vector for loop in loops(interp.ast)], [None] * 5)
+
+    def test_short_loops_and_missing_numpy_use_the_interpreter(self):
+        source = """
+            int main() {
+                int a[8];
+                int s = 0;
+                for (int i = 0; i < 8; i++) a[i] = i;
+                for (int i = 0; i < 8; i++) s += a[i];
+                return s;
+            }
+        """
+        (_, vectorized) = self.assertSameResult(source)
+        self.assertEqual(vectorized, 0)
+        with patch.object(c_vectorize, "numpy", None):
+            (result, interp) = run(source)
+        self.assertEqual(result, 28)
+        self.assertFalse(interp.vectorize)
+
+
+if __name__ == "__main__":
+    unittest.main()